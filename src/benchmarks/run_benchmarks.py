@@ -0,0 +1,252 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import statistics
+import subprocess
+import traceback
+import numpy as np
+import pyvista as pv
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(SRC_DIR, "preprocessing"))
+sys.path.insert(0, os.path.join(SRC_DIR, "inference"))
+
+import metrics
+from utils import *
+from utils.abaqus_utils import _get_point_cloud_from_inp_file
+from inp_to_vtk import convert_inp_to_vtk
+from synthetic_data import (
+    write_synthetic_case,
+    write_synthetic_image_pair,
+)
+
+# Approximate number of aorta nodes of every synthetic case
+SCALES = [1_000, 10_000, 100_000]
+# Side of the compared half of every synthetic image pair
+IMAGE_SCALES = [256, 512, 1024]
+REPEAT = 5
+REPORT_FILE = "benchmark_report.json"
+WORK_DIR = None  # A temporary directory
+INTENSITY_THRESHOLD = metrics.INTENSITY_THRESHOLD
+
+pv.OFF_SCREEN = True
+
+
+def time_function(func: Callable, repeat: int = REPEAT) -> Dict:
+    """
+    Times a function over several runs after a warm-up run.
+
+    Parameters:
+        func (Callable): The function to time, called without arguments.
+        repeat (int, optional): The number of timed runs. Default is REPEAT.
+
+    Returns:
+        Dict: The min, median and mean time (in seconds) and every timed run,
+        or the error raised by the function.
+    """
+    try:
+        func()
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - start)
+    except Exception as exception:
+        return {
+            "error": f"{type(exception).__name__}: {exception}",
+            "traceback": traceback.format_exc(),
+        }
+
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "runs": timings,
+    }
+
+
+def get_case_benchmarks(paths: Dict[str, str], work_dir: str) -> Dict[str, Callable]:
+    """
+    Returns the preprocessing stages to time on a synthetic case.
+
+    The legacy entry points are timed next to the ones replacing them, e.g.
+    `extract_part` and `extract_parts_from_inp_file`. Cached stages are timed
+    on a warm cache, filled by their warm-up run.
+    """
+    with open(paths["deck"], "r") as file:
+        deck = file.read()
+
+    aorta = pv.read(paths["aorta_vtk"])
+    stent = pv.read(paths["stent_vtk"])
+    aorta.point_data["Stress"] = np.linspace(0.0, 0.5, aorta.n_points)
+    stent.point_data["Stress"] = np.zeros(stent.n_points)
+    geometry = stent + aorta
+    snapshots_path = os.path.join(work_dir, "snapshots", "SYNTHETIC_26MM")
+    os.makedirs(os.path.dirname(snapshots_path), exist_ok=True)
+
+    parts_dir = os.path.join(work_dir, "parts")
+    os.makedirs(parts_dir, exist_ok=True)
+    part_paths = {
+        "AORTA": os.path.join(parts_dir, "AORTA_PRE.inp"),
+        "STENT": os.path.join(parts_dir, "STENT_PRE.inp"),
+    }
+    columns_path = paths["spos"] + RESULT_COLUMNS_EXTENSION
+    write_result_columns(paths["spos"], STRESS_COLUMN, columns_path)
+    cache_dir = os.path.join(work_dir, "cache")
+
+    def compute_node_index():
+        sorted_labels, order = get_node_index(read_inp_nodes(paths["aorta_inp"])[0])
+        return {"labels": sorted_labels, "order": order}
+
+    # The scalar views are rendered by the warm-up run of colorize_views
+    scalar_views = {}
+
+    def colorize():
+        if not scalar_views:
+            scalar_views.update(render_rotating_scalar_views(geometry, ["Stress"]))
+        return colorize_views(
+            scalar_views["scalars.Stress"],
+            scalar_views["shading"],
+            scalar_views["coverage"],
+            [0.0, 0.5],
+        )
+
+    return {
+        "extract_part": lambda: extract_part(deck, "AORTA"),
+        "extract_parts_from_inp_file": lambda: extract_parts_from_inp_file(
+            paths["deck"], part_paths
+        ),
+        "read_inp_nodes": lambda: read_inp_nodes(paths["aorta_inp"]),
+        "_get_point_cloud_from_inp_file": lambda: _get_point_cloud_from_inp_file(
+            paths["aorta_inp"]
+        ),
+        "get_stress_result": lambda: get_stress_result(
+            paths["aorta_inp"], paths["spos"]
+        ),
+        "write_result_columns": lambda: write_result_columns(
+            paths["spos"], STRESS_COLUMN, columns_path
+        ),
+        "read_result_column": lambda: (
+            read_result_column(columns_path, "Node"),
+            read_result_column(columns_path, "Value"),
+        ),
+        "convert_inp_to_vtk": lambda: convert_inp_to_vtk(paths["aorta_pre"]),
+        "read_mesh": lambda: read_mesh(paths["aorta_vtk"]),
+        "read_mesh (cache_dir)": lambda: read_mesh(paths["aorta_vtk"], cache_dir),
+        "cached_arrays": lambda: cached_arrays(
+            cache_dir, "node_index", [paths["aorta_inp"]], compute_node_index
+        ),
+        "generate_rotating_snapshots": lambda: generate_rotating_snapshots(
+            geometry, snapshots_path, clim=[0.0, 0.5]
+        ),
+        "render_rotating_scalar_views": lambda: render_rotating_scalar_views(
+            geometry, ["Stress"]
+        ),
+        "colorize_views": colorize,
+    }
+
+
+def run_benchmarks(
+    scales: List[int] = SCALES,
+    image_scales: List[int] = IMAGE_SCALES,
+    repeat: int = REPEAT,
+    report_file: str = REPORT_FILE,
+    work_dir: str = WORK_DIR,
+) -> Dict:
+    """
+    Times every preprocessing and evaluation stage on synthetic data at several scales.
+
+    Every scale generates an Abaqus deck with STENT and AORTA parts, its extracted
+    parts, CONTACT/SPOS results and VTK meshes, every image scale generates a
+    real/fake image pair. The timings are written to a JSON report, stages that
+    fail record their error instead of their timings.
+
+    Parameters:
+        scales (List[int], optional): The approximate numbers of aorta nodes. Default is SCALES.
+        image_scales (List[int], optional): The sides of the compared images. Default is IMAGE_SCALES.
+        repeat (int, optional): The number of timed runs of every stage. Default is REPEAT.
+        report_file (str, optional): The path of the report (.json) file. Default is REPORT_FILE.
+        work_dir (str, optional): The directory of the synthetic data, kept after the run.
+            Default is a temporary directory.
+
+    Returns:
+        Dict: The report.
+
+    Example:
+        run_benchmarks(scales=[1_000, 1_000_000], repeat=3)
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=SRC_DIR,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pyvista": pv.__version__,
+        "repeat": repeat,
+        "benchmarks": [],
+    }
+
+    temporary = work_dir is None
+    if temporary:
+        work_dir = tempfile.mkdtemp(prefix="tavi-benchmark-")
+
+    def add_result(benchmark: str, scale: Dict, func: Callable) -> None:
+        result = time_function(func, repeat)
+        report["benchmarks"].append({"name": benchmark, **scale, **result})
+        if "error" in result:
+            print(f"{benchmark} {scale}: {result['error']}")
+        else:
+            print(f"{benchmark} {scale}: {result['min']:.4f}s")
+
+    try:
+        for num_nodes in scales:
+            case_dir = os.path.join(work_dir, "Patients", f"NODES-{num_nodes}", "26MM")
+            paths = write_synthetic_case(case_dir, num_nodes)
+            nodes = len(read_inp_nodes(paths["aorta_inp"])[0])
+            elements = len(read_inp_elements(paths["aorta_pre"])[0][1])
+            scale = {"nodes": nodes, "elements": elements}
+
+            for benchmark, func in get_case_benchmarks(paths, case_dir).items():
+                add_result(benchmark, scale, func)
+
+        for image_size in image_scales:
+            image_dir = os.path.join(work_dir, "Images", f"SIZE-{image_size}")
+            real_path, fake_path = write_synthetic_image_pair(
+                image_dir, "SYNTHETIC_26MM_z_000", image_size
+            )
+            add_result(
+                "calculate_evaluation_metrics",
+                {"image_shape": [image_size, image_size]},
+                lambda: metrics.calculate_evaluation_metrics(
+                    real_path, fake_path, INTENSITY_THRESHOLD, log_file_path=None
+                ),
+            )
+    finally:
+        if temporary:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    with open(report_file, "w") as file:
+        json.dump(report, file, indent=1)
+
+    return report
+
+
+if __name__ == "__main__":
+    run_benchmarks()
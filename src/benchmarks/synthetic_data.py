@@ -0,0 +1,206 @@
+import io
+import os
+import sys
+import cv2
+import numpy as np
+import pandas as pd
+import pyvista as pv
+from typing import Dict, Tuple
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(SRC_DIR, "preprocessing"))
+
+from utils.abaqus_utils import PRESSURE_COLUMN, STRESS_COLUMN
+
+
+def make_tube(
+    num_nodes: int, radius: float = 12.0, height: float = 50.0, z_offset: float = 0.0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Creates a triangulated open tube with approximately num_nodes nodes.
+
+    Parameters:
+        num_nodes (int): The approximate number of nodes.
+        radius (float, optional): The radius of the tube. Default is 12.0.
+        height (float, optional): The height of the tube. Default is 50.0.
+        z_offset (float, optional): The height of the bottom of the tube. Default is 0.0.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The (N, 3) points and the (M, 3) triangles as point indices.
+    """
+    num_theta = max(8, int(np.sqrt(num_nodes / 3)))
+    num_z = max(2, int(np.ceil(num_nodes / num_theta)))
+
+    theta, z = np.meshgrid(
+        np.linspace(0, 2 * np.pi, num_theta, endpoint=False),
+        np.linspace(z_offset, z_offset + height, num_z),
+    )
+    # A slight bulge keeps the curvature and the shading non trivial
+    r = radius * (1 + 0.1 * np.sin(np.pi * (z - z_offset) / height))
+    points = np.stack([r * np.cos(theta), r * np.sin(theta), z], axis=-1).reshape(-1, 3)
+
+    rows, columns = np.meshgrid(
+        np.arange(num_z - 1), np.arange(num_theta), indexing="ij"
+    )
+    a = rows * num_theta + columns
+    b = rows * num_theta + (columns + 1) % num_theta
+    c = a + num_theta
+    d = b + num_theta
+    triangles = np.concatenate(
+        [np.stack([a, b, d], -1).reshape(-1, 3), np.stack([a, d, c], -1).reshape(-1, 3)]
+    )
+
+    return points, triangles
+
+
+def format_part(name: str, points: np.ndarray, triangles: np.ndarray) -> str:
+    """
+    Formats a triangulated surface as an Abaqus '*Part' block with S3 elements.
+    """
+    nodes = io.StringIO()
+    labels = np.arange(1, len(points) + 1)
+    np.savetxt(
+        nodes,
+        np.column_stack([labels, points]),
+        fmt=["%7d", "%.6f", "%.6f", "%.6f"],
+        delimiter=", ",
+    )
+    elements = io.StringIO()
+    np.savetxt(
+        elements,
+        np.column_stack([np.arange(1, len(triangles) + 1), triangles + 1]),
+        fmt="%d",
+        delimiter=", ",
+    )
+    return (
+        f"*Part, name={name}\n*Node\n{nodes.getvalue()}"
+        f"*Element, type=S3\n{elements.getvalue()}*End Part\n"
+    )
+
+
+def format_result(labels: np.ndarray, values: np.ndarray, column_name: str) -> str:
+    """
+    Formats nodal values like the CONTACT and SPOS result files exported from Abaqus.
+    """
+    return pd.DataFrame(
+        {
+            "Frame": 1,
+            "Part Instance Name": "AORTA-1",
+            "Node Label": labels,
+            column_name: values,
+        }
+    ).to_csv(index=False, sep=",", float_format="%.6f")
+
+
+def write_synthetic_case(
+    case_dir: str, num_nodes: int, seed: int = 0
+) -> Dict[str, str]:
+    """
+    Writes the files of a synthetic (patient, size) case.
+
+    The case has the full deck with the STENT and AORTA parts, the extracted
+    part decks, the AORTA deck, CONTACT/SPOS results and legacy VTK meshes of
+    both parts, named like the files of a real case.
+
+    Parameters:
+        case_dir (str): The directory of the case.
+        num_nodes (int): The approximate number of aorta nodes, the stent has a quarter.
+        seed (int, optional): The seed of the random result values. Default is 0.
+
+    Returns:
+        Dict[str, str]: The path of every written file, by role.
+
+    Example:
+        paths = write_synthetic_case('/tmp/bench/PATIENT-0/26MM', 100_000)
+    """
+    os.makedirs(case_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    aorta = make_tube(num_nodes)
+    stent = make_tube(max(num_nodes // 4, 16), radius=11.0, height=40.0, z_offset=5.0)
+    aorta_part = format_part("AORTA", *aorta)
+    stent_part = format_part("STENT", *stent)
+
+    deck_path = os.path.join(case_dir, "SYNTHETIC_26MM.inp")
+    paths = {
+        "deck": deck_path,
+        "aorta_inp": os.path.join(case_dir, "AORTA.inp"),
+        "aorta_pre": deck_path + "AORTA_PRE.inp",
+        "stent_pre": deck_path + "STENT_PRE.inp",
+        "contact": os.path.join(case_dir, "CONTACT.csv"),
+        "spos": os.path.join(case_dir, "SPOS.csv"),
+        "aorta_vtk": deck_path + "AORTA_PRE.inp.vtk",
+        "stent_vtk": deck_path + "STENT_PRE.inp.vtk",
+    }
+
+    with open(deck_path, "w") as file:
+        file.write("*Heading\n** Synthetic benchmark deck\n")
+        file.write(stent_part + aorta_part)
+        file.write("*Assembly, name=Assembly\n*End Assembly\n")
+    with open(paths["aorta_inp"], "w") as file:
+        file.write("*Heading\n" + aorta_part)
+    with open(paths["aorta_pre"], "w") as file:
+        file.write(aorta_part)
+    with open(paths["stent_pre"], "w") as file:
+        file.write(stent_part)
+
+    # Results are exported in a shuffled node order
+    labels = rng.permutation(len(aorta[0])) + 1
+    z = aorta[0][labels - 1, 2]
+    with open(paths["contact"], "w") as file:
+        file.write(
+            format_result(
+                labels, np.clip(np.sin(z / 7), 0, None) * 0.4, PRESSURE_COLUMN
+            )
+        )
+    with open(paths["spos"], "w") as file:
+        file.write(format_result(labels, np.abs(np.cos(z / 9)) * 0.5, STRESS_COLUMN))
+
+    for name, (points, triangles) in [("aorta_vtk", aorta), ("stent_vtk", stent)]:
+        faces = np.column_stack([np.full(len(triangles), 3), triangles]).ravel()
+        pv.PolyData(points, faces).cast_to_unstructured_grid().save(
+            paths[name], binary=True
+        )
+
+    return paths
+
+
+def write_synthetic_image_pair(
+    image_dir: str, name: str, size: int = 512, seed: int = 0
+) -> Tuple[str, str]:
+    """
+    Writes a real/fake pair of result images like the pix2pix test outputs.
+
+    The images are (size, 512 + size) with the input on the left half and a
+    colored blob on a white background on the compared right half.
+
+    Parameters:
+        image_dir (str): The directory of the images.
+        name (str): The base name of the pair, e.g. 'PATIENT-0_26MM_z_000'.
+        size (int, optional): The side of the compared half. Default is 512.
+        seed (int, optional): The seed of the random noise. Default is 0.
+
+    Returns:
+        Tuple[str, str]: The paths of the real and fake images.
+    """
+    os.makedirs(image_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+
+    rows, columns = np.mgrid[:size, : 512 + size]
+    blob = (rows - size / 2) ** 2 + (columns - 512 - size / 2) ** 2 < (size / 3) ** 2
+
+    real = np.full((size, 512 + size), 255, dtype=np.uint8)
+    real[blob] = rng.integers(0, 160, blob.sum())
+    fake = real.copy()
+    fake[blob] = np.clip(real[blob] + rng.integers(-30, 30, blob.sum()), 0, 254)
+
+    paths = (
+        os.path.join(image_dir, name + "_real.png"),
+        os.path.join(image_dir, name + "_fake.png"),
+    )
+    for path, image in zip(paths, (real, fake)):
+        colored = cv2.applyColorMap(image, cv2.COLORMAP_JET)
+        colored[image == 255] = 255
+        cv2.imwrite(path, colored)
+
+    return paths
@@ -1,27 +1,293 @@
 import os
+import re
+import sys
+import io
+import csv
 import cv2
 import numpy as np
+import pandas as pd
 from tqdm import tqdm
-from skimage.metrics import (
-    mean_squared_error,
-    structural_similarity,
-)
-from sklearn.metrics import (
-    precision_score,
-    recall_score,
-    fbeta_score,
-    matthews_corrcoef,
-    jaccard_score,
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from collections import defaultdict
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, the appends are not locked
+    fcntl = None
+
+# The profiling helpers are shared with the preprocessing scripts, importing them
+# does not import the other utils modules
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "preprocessing")
 )
+from utils.profiling_utils import profile_stage, profiled  # noqa: E402
 
 INTENSITY_THRESHOLD = 40
-LOGS_FILE_PATH = "Logs/vms_metrics.txt"
+LOGS_FILE_PATH = "Logs/vms_metrics.csv"
+METRICS_COLUMNS = [
+    "precision", "recall", "f2", "mcc", "jaccard", "mse", "iou", "ssim"]
+LOG_COLUMNS = ["case", "view"] + METRICS_COLUMNS
+NUM_WORKERS = os.cpu_count()
+SSIM_CHUNK_SIZE = 4
+
+
+def _filter_axis(images, axis, crop, weights=None, size=7):
+    """
+    Filter a stack of images along one axis with reflected borders, like
+    scipy.ndimage with mode='reflect', keeping only the samples not cropped.
+    Args:
+        images (np.ndarray): Stack of images.
+        axis (int): Axis to filter along.
+        crop (int): Number of samples dropped on both sides of the axis.
+        weights (np.ndarray): Normalized 1D kernel, None for a box sum that
+        keeps the dtype of the images.
+        size (int): Size of the box sum.
+    Returns:
+        np.ndarray: The filtered stack.
+    """
+    if weights is not None:
+        size = len(weights)
+    radius = size // 2
+
+    # Borders are only needed when the kernel reaches past the cropped samples
+    if radius > crop:
+        pad_width = [(0, 0)] * images.ndim
+        pad_width[axis] = (radius - crop, radius - crop)
+        images = np.pad(images, pad_width, mode="symmetric")
+        crop = radius
+    start = crop - radius
+    length = images.shape[axis] - 2 * crop
+
+    def window(offset):
+        index = [slice(None)] * images.ndim
+        index[axis] = slice(start + offset, start + offset + length)
+        return images[tuple(index)]
+
+    if weights is None:
+        filtered = window(0).copy()
+        for offset in range(1, size):
+            filtered += window(offset)
+        return filtered
+
+    filtered = weights[0] * window(0)
+    for offset in range(1, size):
+        filtered += weights[offset] * window(offset)
+    return filtered
+
+
+@profiled("ssim")
+def structural_similarity_batch(
+    images1,
+    images2,
+    win_size: int = None,
+    gaussian_weights: bool = False,
+    data_range: float = None,
+    sigma: float = 1.5,
+    chunk_size: int = SSIM_CHUNK_SIZE
+):
+    """
+    Compute the mean SSIM of every pair of images in two (N, H, W) stacks.
+    The parameters and results match skimage.metrics.structural_similarity,
+    the local statistics are computed with separable filters on whole stacks
+    and only for the windows inside the images, which are the ones averaged.
+    Args:
+        images1 (np.ndarray): First stack of grayscale images.
+        images2 (np.ndarray): Second stack of grayscale images.
+        win_size (int): Side of the sliding window, 7 for the box filter and
+        11 for the Gaussian filter by default.
+        gaussian_weights (bool): Weight the window with a Gaussian kernel.
+        data_range (float): Data range of the images, from the dtype by default.
+        sigma (float): Standard deviation of the Gaussian kernel.
+        chunk_size (int): Number of pairs processed at once, small chunks keep
+        the intermediate arrays in cache and bound the memory use.
+    Returns:
+        np.ndarray: The SSIM of every pair.
+    """
+    images1 = np.asarray(images1)
+    images2 = np.asarray(images2)
+    if images1.shape != images2.shape or images1.ndim != 3:
+        raise ValueError("Input images must be (N, H, W) stacks of the same shape")
+
+    is_integer = np.issubdtype(images1.dtype, np.integer)
+    if data_range is None:
+        if not is_integer:
+            raise ValueError("data_range must be given for floating point images")
+        info = np.iinfo(images1.dtype)
+        data_range = info.max - info.min if info.min < 0 else info.max
+
+    weights = None
+    if gaussian_weights:
+        radius = int(3.5 * sigma + 0.5)
+        win_size = win_size or 2 * radius + 1
+        positions = np.arange(-radius, radius + 1)
+        weights = np.exp(-0.5 * (positions / sigma) ** 2)
+        weights /= weights.sum()
+    else:
+        win_size = win_size or 7
+    if win_size % 2 == 0 or win_size > min(images1.shape[1:]):
+        raise ValueError("win_size must be odd and fit in the images")
+
+    # Sample covariance is only used with the box filter, like skimage
+    num_pixels = win_size ** 2
+    cov_norm = 1.0 if gaussian_weights else num_pixels / (num_pixels - 1.0)
+    c1 = (0.01 * data_range) ** 2
+    c2 = (0.03 * data_range) ** 2
+    pad = (win_size - 1) // 2
+
+    # Box sums of integer images are exact in integer arithmetic
+    dtype = np.float64
+    if is_integer and not gaussian_weights:
+        info = np.iinfo(images1.dtype)
+        largest = max(abs(int(info.min)), int(info.max)) ** 2 * num_pixels
+        dtype = np.int32 if largest <= np.iinfo(np.int32).max else np.int64
+
+    def local_mean(images):
+        filtered = _filter_axis(
+            _filter_axis(images, 1, pad, weights, win_size),
+            2, pad, weights, win_size)
+        if weights is None:
+            return filtered / num_pixels
+        return filtered
+
+    chunk_size = chunk_size or len(images1)
+    ssim = np.empty(len(images1))
+    for start in range(0, len(images1), max(1, chunk_size)):
+        x = images1[start:start + chunk_size].astype(dtype)
+        y = images2[start:start + chunk_size].astype(dtype)
+
+        ux, uy = local_mean(x), local_mean(y)
+        vx = cov_norm * (local_mean(x * x) - ux * ux)
+        vy = cov_norm * (local_mean(y * y) - uy * uy)
+        vxy = cov_norm * (local_mean(x * y) - ux * uy)
+
+        s = ((2 * ux * uy + c1) * (2 * vxy + c2)) \
+            / ((ux ** 2 + uy ** 2 + c1) * (vx + vy + c2))
+        ssim[start:start + chunk_size] = s.mean(axis=(1, 2))
+
+    return ssim
+
+
+def get_confusion_counts(mask_ground_truth, mask_predicted):
+    """
+    Count the confusion matrix entries of a pair of binary masks.
+    Args:
+        mask_ground_truth (np.ndarray): Boolean ground truth mask.
+        mask_predicted (np.ndarray): Boolean predicted mask.
+    Returns:
+        tuple: A tuple containing the true positive, false positive,
+        false negative and true negative pixel counts.
+    """
+    true_positive = np.count_nonzero(mask_ground_truth & mask_predicted)
+    ground_truth_positive = np.count_nonzero(mask_ground_truth)
+    predicted_positive = np.count_nonzero(mask_predicted)
+
+    false_positive = predicted_positive - true_positive
+    false_negative = ground_truth_positive - true_positive
+    true_negative = mask_ground_truth.size - true_positive \
+        - false_positive - false_negative
+
+    return true_positive, false_positive, false_negative, true_negative
+
+
+def calculate_confusion_metrics(
+    true_positive: int,
+    false_positive: int,
+    false_negative: int,
+    true_negative: int
+):
+    """
+    Derive the binary classification metrics from confusion matrix counts.
+    Undefined ratios are 0, like the sklearn scorers, except for the IOU
+    which is NaN when both masks are empty.
+    Args:
+        true_positive (int): Number of true positive pixels.
+        false_positive (int): Number of false positive pixels.
+        false_negative (int): Number of false negative pixels.
+        true_negative (int): Number of true negative pixels.
+    Returns:
+        tuple: A tuple containing precision, recall, f2 score, mcc,
+        jaccard index and iou score.
+    """
+    tp, fp, fn, tn = map(float, (
+        true_positive, false_positive, false_negative, true_negative))
+
+    def ratio(numerator, denominator):
+        return numerator / denominator if denominator else 0.0
+
+    precision = ratio(tp, tp + fp)
+    recall = ratio(tp, tp + fn)
+    f2 = ratio(5 * tp, 5 * tp + 4 * fn + fp)
+    mcc = ratio(tp * tn - fp * fn,
+                np.sqrt((tp + fp) * (tp + fn) * (tn + fp) * (tn + fn)))
+    jaccard = ratio(tp, tp + fp + fn)
+    iou_score = tp / (tp + fp + fn) if tp + fp + fn else np.nan
+
+    return precision, recall, f2, mcc, jaccard, iou_score
+
+
+@profiled("decode")
+def load_image_pair(ground_truth_path: str, predicted_path: str):
+    """
+    Load the compared halves of a pair of ground truth and predicted images.
+    Args:
+        ground_truth_path (str): Path to the ground truth image.
+        predicted_path (str): Path to the predicted image.
+    Returns:
+        tuple: The grayscale ground truth and predicted images.
+    """
+    ground_truth = cv2.imread(ground_truth_path, cv2.IMREAD_GRAYSCALE)
+    predicted = cv2.imread(predicted_path, cv2.IMREAD_GRAYSCALE)
+
+    return ground_truth[:, 512:], predicted[:, 512:]
+
+
+@profiled("metrics")
+def calculate_stack_metrics(ground_truths, predicted, intensity_threshold: int):
+    """
+    Calculate evaluation metrics for stacks of ground truth and predicted images.
+    Args:
+        ground_truths (np.ndarray): (N, H, W) stack of ground truth images.
+        predicted (np.ndarray): (N, H, W) stack of predicted images.
+        intensity_threshold (int): Intensity threshold for binary conversion.
+    Returns:
+        np.ndarray: (N, 8) array with the precision, recall, f2 score, mcc,
+        jaccard index, mse, iou score, and ssim of every pair.
+    """
+    ground_truths = np.asarray(ground_truths)
+    predicted = np.asarray(predicted)
+    metrics = np.empty((len(ground_truths), 8))
+
+    # White pixels are background, the masks keep the pixels above the threshold
+    backgrounds = ground_truths != 255
+    masks_ground_truth = (ground_truths > intensity_threshold) & backgrounds
+    masks_predicted = (predicted > intensity_threshold) & backgrounds
+
+    for i in range(len(ground_truths)):
+        precision, recall, f2, mcc, jaccard, iou_score = \
+            calculate_confusion_metrics(*get_confusion_counts(
+                masks_ground_truth[i], masks_predicted[i]))
+
+        difference = np.where(
+            backgrounds[i],
+            ground_truths[i].astype(np.float64) - predicted[i].astype(np.float64),
+            0.0
+        )
+        mse = np.mean(np.square(difference)) / np.max(ground_truths[i])
+
+        metrics[i, :7] = precision, recall, f2, mcc, jaccard, mse, iou_score
+
+    metrics[:, 7] = structural_similarity_batch(ground_truths, predicted)
+
+    return metrics
 
 
 def calculate_evaluation_metrics(
     ground_truth_path: str,
     predicted_path: str,
-    intensity_threshold: int
+    intensity_threshold: int,
+    log_file_path: str = LOGS_FILE_PATH,
+    sink=None
 ):
     """
     Calculate evaluation metrics for a pair of ground truth and predicted images.
@@ -29,73 +295,39 @@ def calculate_evaluation_metrics(
         ground_truth_path (str): Path to the ground truth image.
         predicted_path (str): Path to the predicted image.
         intensity_threshold (int): Intensity threshold for binary conversion.
+        log_file_path (str): File the metrics are appended to, None to skip logging.
+        sink (MetricsSink): Open sink shared by the calls the metrics are added
+            to instead of log_file_path, None to append them right away.
     Returns:
         tuple: A tuple containing precision, recall, f2 score, mcc, jaccard index,
         mse, iou score, and ssim.
     """
-    ground_truth = cv2.imread(ground_truth_path, cv2.IMREAD_GRAYSCALE)
-    predicted = cv2.imread(predicted_path, cv2.IMREAD_GRAYSCALE)
+    ground_truth, predicted = load_image_pair(ground_truth_path, predicted_path)
 
-    ground_truth = ground_truth[:, 512:]
-    predicted = predicted[:, 512:]
-
-    _, background = cv2.threshold(
-        ground_truth, 254, 1, cv2.THRESH_BINARY_INV)
-
-    _, mask_ground_truth = cv2.threshold(
-        ground_truth, intensity_threshold, 1, cv2.THRESH_BINARY)
-    _, mask_predicted = cv2.threshold(
-        predicted, intensity_threshold, 1, cv2.THRESH_BINARY)
-
-    mask_ground_truth = mask_ground_truth * background
-    mask_predicted = mask_predicted * background
-
-    intersection = np.logical_and(mask_ground_truth, mask_predicted)
-    union = np.logical_or(mask_ground_truth, mask_predicted)
-    iou_score = np.sum(intersection) / np.sum(union)
-
-    mask_ground_truth_flat = mask_ground_truth.flatten()
-    mask_predicted_flat = mask_predicted.flatten()
-
-    ssim = structural_similarity(ground_truth, predicted)
-    precision = precision_score(mask_ground_truth_flat, mask_predicted_flat)
-    recall = recall_score(mask_ground_truth_flat, mask_predicted_flat)
-    f2 = fbeta_score(mask_ground_truth_flat, mask_predicted_flat, beta=2)
-    mcc = matthews_corrcoef(mask_ground_truth_flat, mask_predicted_flat)
-    jaccard = jaccard_score(mask_ground_truth_flat, mask_predicted_flat)
-    mse = mean_squared_error(ground_truth * background, predicted * background) \
-        / np.max(ground_truth)
-    
-    filename = ground_truth_path.rsplit("/")[-1]  
-    write_metrics_to_file(
-        LOGS_FILE_PATH,
-        f"{filename} \t Precision: {precision}, Recall: {recall}, F2: {f2}, \
-            MCC: {mcc}, Jaccard: {jaccard}, MSE: {mse}, IOU: {iou_score}, SSIM: {ssim}\n"
-    )
+    precision, recall, f2, mcc, jaccard, mse, iou_score, ssim = \
+        calculate_stack_metrics(
+            ground_truth[None], predicted[None], intensity_threshold)[0]
+
+    metrics = [precision, recall, f2, mcc, jaccard, mse, iou_score, ssim]
+    if sink is not None:
+        sink.add(*get_case_and_view(ground_truth_path), metrics)
+    elif log_file_path is not None:
+        with MetricsSink(log_file_path) as sink:
+            sink.add(*get_case_and_view(ground_truth_path), metrics)
 
     return precision, recall, f2, mcc, jaccard, mse, iou_score, ssim
 
 
-def calculate_metrics(image_folder):
+def get_image_pairs(image_folder):
     """
-    Calculate evaluation metrics for a set of ground truth and predicted images.
+    List the pairs of ground truth and predicted images in a folder.
     Args:
         image_folder (str): Path to the folder containing the images.
-    Returns:    
-        tuple: A tuple containing average mse, average iou, average ssim, average precision,
-        average recall, average f2 score, average mcc, and average jaccard index.
+    Returns:
+        list: A list of (real image path, fake image path) tuples.
     """
-
-    mse_values = []
-    iou_values = []
-    ssim_values = []
-    precision_values = []
-    recall_values = []
-    f2_values = []
-    mcc_values = []
-    jaccard_values = []
-
-    for file in tqdm(os.listdir(image_folder)):
+    pairs = []
+    for file in os.listdir(image_folder):
 
         if file.endswith("_real.png"):
             base_name = file.replace("_real.png", "")
@@ -104,19 +336,126 @@ def calculate_metrics(image_folder):
                 image_folder, base_name + "_fake.png")
 
             if os.path.exists(fake_image_path):
-                precision, recall, f2, mcc, jaccard, \
-                    mse, iou, ssim = calculate_evaluation_metrics(
-                        real_image_path, fake_image_path, INTENSITY_THRESHOLD
-                    )
-
-                precision_values.append(precision)
-                recall_values.append(recall)
-                f2_values.append(f2)
-                mcc_values.append(mcc)
-                jaccard_values.append(jaccard)
-                mse_values.append(mse)
-                iou_values.append(iou)
-                ssim_values.append(ssim)
+                pairs.append((real_image_path, fake_image_path))
+
+    return pairs
+
+
+def get_case_and_view(image_path: str):
+    """
+    Split the name of a result image into its case and view.
+    Args:
+        image_path (str): Path to an image named like
+        'PATIENT_SIZE_z_000_real.png'.
+    Returns:
+        tuple: The case name and the view name, empty if the image has no view.
+    """
+    base_name = os.path.basename(image_path).rsplit("_", 1)[0]
+    parts = base_name.rsplit("_", 2)
+    if len(parts) < 3:
+        return base_name, ""
+    return parts[0], parts[1] + "_" + parts[2]
+
+
+def group_pairs_by_case(pairs):
+    """
+    Group the pairs of ground truth and predicted images by case.
+    Args:
+        pairs (list): A list of (real image path, fake image path) tuples.
+    Returns:
+        dict: The pairs of every case, sorted by view.
+    """
+    cases = defaultdict(list)
+    for pair in pairs:
+        cases[get_case_and_view(pair[0])[0]].append(pair)
+
+    return {case: sorted(case_pairs, key=lambda pair: get_case_and_view(pair[0])[1])
+            for case, case_pairs in cases.items()}
+
+
+def _evaluate_case(case_pairs, intensity_threshold):
+    case = get_case_and_view(case_pairs[0][0])[0]
+    with profile_stage("evaluate_case", case=case, views=len(case_pairs)):
+        ground_truths, predicted = zip(
+            *[load_image_pair(*pair) for pair in case_pairs])
+        return calculate_stack_metrics(
+            np.stack(ground_truths), np.stack(predicted), intensity_threshold)
+
+
+def evaluate_cases(pairs, num_workers: int = NUM_WORKERS):
+    """
+    Evaluate all views of every case at once, spreading the cases across workers.
+    Args:
+        pairs (list): A list of (real image path, fake image path) tuples.
+        num_workers (int): Number of worker processes.
+    Returns:
+        tuple: The pairs ordered by case and view, and the (N, 8) array of
+        their metrics as returned by calculate_stack_metrics.
+    """
+    cases = list(group_pairs_by_case(pairs).values())
+    evaluate_case = partial(
+        _evaluate_case, intensity_threshold=INTENSITY_THRESHOLD)
+
+    if num_workers > 1 and len(cases) > 1:
+        chunksize = max(1, len(cases) // (4 * num_workers))
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            results = list(tqdm(
+                executor.map(evaluate_case, cases, chunksize=chunksize),
+                total=len(cases)))
+    else:
+        results = [evaluate_case(case_pairs) for case_pairs in tqdm(cases)]
+
+    ordered_pairs = [pair for case_pairs in cases for pair in case_pairs]
+    metrics = np.concatenate(results) if results else np.empty((0, 8))
+    return ordered_pairs, metrics
+
+
+def calculate_ssim_by_case(image_folder, num_workers: int = NUM_WORKERS):
+    """
+    Calculate the SSIM of every view of every case.
+    Args:
+        image_folder (str): Path to the folder containing the images.
+        num_workers (int): Number of worker processes.
+    Returns:
+        tuple: A dict with the per view SSIM array of every case, and the
+        per view SSIM averaged over all cases with the same number of views.
+    """
+    pairs, metrics = evaluate_cases(get_image_pairs(image_folder), num_workers)
+
+    case_ssim = defaultdict(list)
+    for (real_image_path, _), ssim in zip(pairs, metrics[:, 7]):
+        case_ssim[get_case_and_view(real_image_path)[0]].append(ssim)
+    case_ssim = {case: np.array(values) for case, values in case_ssim.items()}
+
+    num_views = max((len(values) for values in case_ssim.values()), default=0)
+    view_ssim = np.mean(
+        [values for values in case_ssim.values() if len(values) == num_views],
+        axis=0) if case_ssim else np.empty(0)
+
+    return case_ssim, view_ssim
+
+
+def calculate_metrics(image_folder, num_workers: int = NUM_WORKERS):
+    """
+    Calculate evaluation metrics for a set of ground truth and predicted images.
+    The views of every case are evaluated together, the cases in parallel,
+    and the metrics of every pair are appended to the log file at once.
+    Args:
+        image_folder (str): Path to the folder containing the images.
+        num_workers (int): Number of worker processes.
+    Returns:    
+        tuple: A tuple containing average mse, average iou, average ssim, average precision,
+        average recall, average f2 score, average mcc, and average jaccard index.
+    """
+    pairs, results = evaluate_cases(get_image_pairs(image_folder), num_workers)
+
+    with MetricsSink(LOGS_FILE_PATH) as sink:
+        for (real_image_path, _), result in zip(pairs, results):
+            sink.add(*get_case_and_view(real_image_path), result)
+
+    precision_values, recall_values, f2_values, mcc_values, \
+        jaccard_values, mse_values, iou_values, ssim_values = \
+        results.T
 
     avg_mse = np.mean(mse_values)
     avg_iou = np.mean(iou_values)
@@ -131,15 +470,124 @@ def calculate_metrics(image_folder):
         avg_recall, avg_f2, avg_mcc, avg_jaccard
 
 
-def write_metrics_to_file(file_path: str, metrics: str):
+class MetricsSink:
     """
-    Append evaluation metrics to a file.
+    Buffer per view metrics and append them in bulk to a CSV file with the
+    LOG_COLUMNS schema. Every flush appends under an exclusive file lock, so
+    sinks in parallel workers can share the same file (without locking on
+    Windows, where fcntl is not available).
     Args:
-        file_path (str): Path to the file.
-        metrics (str): Evaluation metrics.
+        file_path (str): Path to the CSV file.
+        buffer_size (int): Number of buffered rows that triggers a flush.
     """
-    with open(file_path, "a") as file:
-        file.write(metrics)
+
+    def __init__(self, file_path: str, buffer_size: int = 4096):
+        self.file_path = file_path
+        self.buffer_size = buffer_size
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.flush()
+
+    def add(self, case: str, view: str, metrics):
+        """
+        Buffer the metrics of a view.
+        Args:
+            case (str): Name of the case.
+            view (str): Name of the view.
+            metrics (list): Values of the METRICS_COLUMNS.
+        """
+        if len(metrics) != len(METRICS_COLUMNS):
+            raise ValueError(f"Expected {len(METRICS_COLUMNS)} metrics")
+
+        self.rows.append([case, view] + [float(value) for value in metrics])
+        if len(self.rows) >= self.buffer_size:
+            self.flush()
+
+    @profiled("log_flush")
+    def flush(self):
+        """
+        Append the buffered rows to the file, writing the header to new files.
+        """
+        if not self.rows:
+            return
+
+        buffer = io.StringIO()
+        csv.writer(buffer, lineterminator="\n").writerows(self.rows)
+
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.file_path, "a", newline="") as file:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_EX)
+            try:
+                if os.fstat(file.fileno()).st_size == 0:
+                    file.write(",".join(LOG_COLUMNS) + "\n")
+                file.write(buffer.getvalue())
+                file.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+
+        self.rows = []
+
+
+def load_metrics(file_path: str = LOGS_FILE_PATH):
+    """
+    Load a metrics CSV file written by MetricsSink.
+    Args:
+        file_path (str): Path to the CSV file.
+    Returns:
+        pd.DataFrame: One row per view with the LOG_COLUMNS.
+    """
+    dtypes = {column: np.float64 for column in METRICS_COLUMNS}
+    dtypes.update(case=str, view=str)
+    return pd.read_csv(file_path, dtype=dtypes, keep_default_na=False,
+                       na_values={column: ["nan", "NaN", ""]
+                                  for column in METRICS_COLUMNS})
+
+
+def aggregate_metrics(metrics, by: str = "case"):
+    """
+    Average the metrics of a metrics table per case or per view.
+    Args:
+        metrics (pd.DataFrame | str): Metrics table or path to a metrics CSV file.
+        by (str): Column to group by, "case" or "view".
+    Returns:
+        pd.DataFrame: The mean of every metric per group.
+    """
+    if isinstance(metrics, str):
+        metrics = load_metrics(metrics)
+
+    return metrics.groupby(by)[METRICS_COLUMNS].mean()
+
+
+def read_text_metrics_log(file_path: str):
+    """
+    Parse a free text metrics log written by earlier versions of this script,
+    e.g. Logs/cp_metrics.txt, into a metrics table.
+    Args:
+        file_path (str): Path to the text log.
+    Returns:
+        pd.DataFrame: One row per view with the LOG_COLUMNS.
+    """
+    names = ["Precision", "Recall", "F2", "MCC", "Jaccard", "MSE", "IOU", "SSIM"]
+    pattern = re.compile(
+        r"(\S+)\s+" + r",\s*".join(rf"{name}: (\S+?)" for name in names) + r"\s*$")
+
+    rows = []
+    with open(file_path, "r") as file:
+        for line in file:
+            match = pattern.match(line.strip())
+            if match:
+                case, view = get_case_and_view(match.group(1))
+                rows.append([case, view] + [float(value) for value in match.groups()[1:]])
+
+    return pd.DataFrame(rows, columns=LOG_COLUMNS)
 
 
 def main():
@@ -1,83 +1,191 @@
 import os
+import sys
 import cv2
+import queue
+import threading
 import numpy as np
 from tqdm import tqdm
-from skimage.metrics import (
-    mean_squared_error,
-    structural_similarity,
-)
-from sklearn.metrics import (
-    precision_score,
-    recall_score,
-    fbeta_score,
-    matthews_corrcoef,
-    jaccard_score,
-)
 
 import matplotlib.pyplot as plt
-from PIL import Image
+
+# The profiling helpers are shared with the preprocessing scripts, importing them
+# does not import the other utils modules
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "preprocessing")
+)
+from utils.profiling_utils import profiled  # noqa: E402
 
 INTENSITY_THRESHOLD = 19
 MASK_PATH = "/mnt/Andromeda/TAVI Results/cp_masks"
+PNG_COMPRESSION = 1
+NUM_WORKERS = os.cpu_count()
+QUEUE_SIZE = 64
+
+# Marks the end of the items flowing through a pipeline stage
+_DONE = object()
+
+
+def mask_image(image, intensity_threshold: int):
+    """
+    Keep the pixels of the compared half of an image brighter than the threshold.
+    Args:
+        image (np.ndarray): Decoded BGR image, masked in place.
+        intensity_threshold (int): Intensity threshold for binary conversion.
+    Returns:
+        np.ndarray: The compared half of the image with a white background.
+    """
+    image = image[:, 512:]
+
+    # The grayscale is computed from the decoded buffer, on the kept half only
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    image[gray <= intensity_threshold] = (255, 255, 255)
+
+    return image
+
+
+def write_mask(mask, image_path: str, mask_path: str, compression: int):
+    """
+    Write a mask under the name of its source image.
+    Args:
+        mask (np.ndarray): BGR mask.
+        image_path (str): Path to the source image.
+        mask_path (str): Folder the mask is written to.
+        compression (int): PNG compression level, from 0 (fastest) to 9.
+    """
+    cv2.imwrite(os.path.join(mask_path, os.path.basename(image_path)), mask,
+                [cv2.IMWRITE_PNG_COMPRESSION, compression])
 
 
 def calculate_evaluation_metrics(
     ground_truth_path: str,
     predicted_path: str,
-    intensity_threshold: int
+    intensity_threshold: int,
+    compression: int = PNG_COMPRESSION
 ):
     """
-    Calculate evaluation metrics for a pair of ground truth and predicted images.
+    Write the masks of a pair of ground truth and predicted images.
     Args:
         ground_truth_path (str): Path to the ground truth image.
         predicted_path (str): Path to the predicted image.
         intensity_threshold (int): Intensity threshold for binary conversion.
-    Returns:
-        tuple: A tuple containing precision, recall, f2 score, mcc, jaccard index,
-        mse, iou score, and ssim.
+        compression (int): PNG compression level, from 0 (fastest) to 9.
     """
-    ground_truth = cv2.imread(ground_truth_path)
-    predicted = cv2.imread(predicted_path)
+    for image_path in (ground_truth_path, predicted_path):
+        mask = mask_image(cv2.imread(image_path), intensity_threshold)
+        write_mask(mask, image_path, MASK_PATH, compression)
 
-    ground_truth_gray = cv2.cvtColor(ground_truth, cv2.COLOR_BGR2GRAY)
-    predicted_gray = cv2.cvtColor(predicted, cv2.COLOR_BGR2GRAY)
 
-    ground_truth = ground_truth[:, 512:]
-    predicted = predicted[:, 512:]
-    ground_truth_gray = ground_truth_gray[:, 512:]
-    predicted_gray = predicted_gray[:, 512:]
+def _run_stage(function, inputs, outputs, num_threads, errors):
+    """
+    Start the threads of a pipeline stage. Every thread applies the function
+    to the items of the inputs queue and puts the results in the outputs
+    queue, the last thread to finish forwards the end marker.
+    Args:
+        function (callable): Function applied to every item, None results are dropped.
+        inputs (queue.Queue): Queue the items are taken from.
+        outputs (queue.Queue): Queue the results are put in, None for the last stage.
+        num_threads (int): Number of threads of the stage.
+        errors (list): List the (item, exception) of failed items are appended to.
+    Returns:
+        list: The started threads.
+    """
+    remaining = [num_threads]
+    lock = threading.Lock()
+
+    def work():
+        while True:
+            item = inputs.get()
+            if item is _DONE:
+                # Let the sibling threads see the end marker too
+                inputs.put(_DONE)
+                break
+
+            try:
+                result = function(item)
+            except Exception as exception:
+                errors.append((item, exception))
+                continue
+
+            if outputs is not None and result is not None:
+                outputs.put(result)
+
+        with lock:
+            remaining[0] -= 1
+            if remaining[0] == 0 and outputs is not None:
+                outputs.put(_DONE)
+
+    threads = [threading.Thread(target=work, daemon=True)
+               for _ in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+@profiled("export_masks")
+def export_masks(
+    image_paths,
+    mask_path: str = MASK_PATH,
+    intensity_threshold: int = INTENSITY_THRESHOLD,
+    compression: int = PNG_COMPRESSION,
+    num_workers: int = NUM_WORKERS,
+    queue_size: int = QUEUE_SIZE
+):
+    """
+    Write the masks of many images with a decode, mask and encode pipeline.
+    The stages run in thread pools connected by bounded queues, OpenCV
+    releases the GIL while decoding and encoding.
+    Args:
+        image_paths (list): Paths to the images.
+        mask_path (str): Folder the masks are written to.
+        intensity_threshold (int): Intensity threshold for binary conversion.
+        compression (int): PNG compression level, from 0 (fastest) to 9.
+        num_workers (int): Number of threads of the decode and encode stages.
+        queue_size (int): Maximum number of images waiting between two stages.
+    Returns:
+        list: The (image path, exception) of the images that failed.
+    """
+    os.makedirs(mask_path, exist_ok=True)
+    paths, decoded, masked = (queue.Queue(queue_size) for _ in range(3))
+    errors = []
+    progress = tqdm(total=len(image_paths))
 
-    _, background = cv2.threshold(
-        ground_truth_gray, 254, 1, cv2.THRESH_BINARY_INV)
+    @profiled("decode")
+    def decode(image_path):
+        image = cv2.imread(image_path)
+        if image is None:
+            raise IOError(f"Cannot read {image_path}")
+        return image_path, image
 
-    _, mask_ground_truth = cv2.threshold(
-        ground_truth_gray, intensity_threshold, 1, cv2.THRESH_BINARY)
-    _, mask_predicted = cv2.threshold(
-        predicted_gray, intensity_threshold, 1, cv2.THRESH_BINARY)
+    @profiled("mask")
+    def mask(item):
+        image_path, image = item
+        return image_path, mask_image(image, intensity_threshold)
 
-    # mask_ground_truth = (mask_ground_truth * background)[:, :, None] * ground_truth
-    # mask_predicted = (mask_predicted * background)[:, :, None] * predicted
+    @profiled("encode")
+    def encode(item):
+        image_path, image = item
+        write_mask(image, image_path, mask_path, compression)
+        progress.update()
 
-    # mask_ground_truth = cv2.cvtColor(mask_ground_truth, cv2.COLOR_BGR2RGB)
-    # mask_predicted = cv2.cvtColor(mask_predicted, cv2.COLOR_BGR2RGB)
+    num_workers = max(1, num_workers)
+    threads = _run_stage(decode, paths, decoded, num_workers, errors)
+    threads += _run_stage(mask, decoded, masked, max(1, num_workers // 2), errors)
+    threads += _run_stage(encode, masked, None, num_workers, errors)
 
-    mask_ground_truth = mask_ground_truth.astype(np.bool_)
-    ground_truth[~mask_ground_truth, :] = (255, 255, 255)
-    ground_truth = cv2.cvtColor(ground_truth, cv2.COLOR_BGR2RGB)
-    mask_predicted = mask_predicted.astype(np.bool_)
-    predicted[~mask_predicted, :] = (255, 255, 255)
-    predicted = cv2.cvtColor(predicted, cv2.COLOR_BGR2RGB)
+    for image_path in image_paths:
+        paths.put(image_path)
+    paths.put(_DONE)
 
-    ground_truth_img = Image.fromarray(ground_truth)
-    predicted_img = Image.fromarray(predicted)
+    for thread in threads:
+        thread.join()
+    progress.close()
 
-    ground_truth_img.save(os.path.join(
-        MASK_PATH, ground_truth_path.split("/")[-1]))
-    predicted_img.save(os.path.join(MASK_PATH, predicted_path.split("/")[-1]))
+    return errors
 
 
 def calculate_metrics(image_folder):
-    for file in tqdm(os.listdir(image_folder)):
+    image_paths = []
+    for file in os.listdir(image_folder):
 
         if file.endswith("_real.png"):
             base_name = file.replace("_real.png", "")
@@ -86,9 +194,10 @@ def calculate_metrics(image_folder):
                 image_folder, base_name + "_fake.png")
 
             if os.path.exists(fake_image_path):
-                calculate_evaluation_metrics(
-                    real_image_path, fake_image_path, INTENSITY_THRESHOLD
-                )
+                image_paths += [real_image_path, fake_image_path]
+
+    for image_path, exception in export_masks(image_paths):
+        print(f"Failed to export the mask of {image_path}: {exception}")
 
 
 def main():
@@ -0,0 +1,55 @@
+import os
+import json
+
+from utils import *
+
+DATA_DIR = "/mnt/Data/Datasets/TAVI/"
+PATIENTS_DIR = "Patients"
+MANIFESTS_DIR = "Manifests"
+CATALOG_FILE = "catalog.json"
+MESH_EXTENSION = ".vtu"
+REPORT_FILE = "curvature_benchmark.json"
+NUM_CASES = 5
+REPEAT = 3
+
+
+def benchmark_curvature(num_cases: int = NUM_CASES, repeat: int = REPEAT) -> None:
+    """
+    Benchmarks the curvature backends on the aorta meshes of the first cases.
+
+    Parameters:
+        num_cases (int, optional): The number of cases to benchmark. Default is NUM_CASES.
+        repeat (int, optional): The number of timed runs of every backend. Default is REPEAT.
+
+    Returns:
+        None
+
+    Example:
+        benchmark_curvature(num_cases=10)
+    """
+    patients_path = os.path.join(DATA_DIR, PATIENTS_DIR)
+    refresh_case_catalog(
+        patients_path, os.path.join(DATA_DIR, MANIFESTS_DIR, CATALOG_FILE)
+    )
+
+    reports = []
+    for patient, size in get_catalog_cases(patients_path)[:num_cases]:
+        aorta_file = get_case_file(
+            patients_path, patient, size, "AORTA_PRE.inp" + MESH_EXTENSION
+        )
+        report = benchmark_curvature_backends(read_mesh(aorta_file), repeat)
+        report["case"] = f"{patient}_{size}"
+        reports.append(report)
+
+        timings = ", ".join(
+            f"{backend} {result['seconds']:.3f}s"
+            for backend, result in report["backends"].items()
+        )
+        print(f"{report['case']} ({report['n_points']} points): {timings}")
+
+    with open(os.path.join(DATA_DIR, REPORT_FILE), "w") as file:
+        json.dump(reports, file, indent=1)
+
+
+if __name__ == "__main__":
+    benchmark_curvature()
@@ -0,0 +1,152 @@
+import os
+import csv
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from utils import *
+
+DATA_DIR = "/mnt/Data/Datasets/TAVI/"
+IMAGES_DIR = "Images-new"
+DATASET_DIR = "Dataset"
+MANIFESTS_DIR = "Manifests"
+SPLIT_MANIFEST = "splits.json"
+TRAIN_DIR = "Train"
+TEST_DIR = "Test"
+SPLITS = [TRAIN_DIR, TEST_DIR]
+FIELDS = ["Raw", "Pressure", "Stress"]
+LABELS_FILE = None
+CASES_PER_SHARD = 64
+NUM_WORKERS = os.cpu_count()
+INCREMENTAL = True
+
+
+def load_labels(labels_file: Optional[str]) -> Dict[str, int]:
+    """
+    Loads the integer label of every case from a CSV file with 'case' and 'label' columns.
+
+    Parameters:
+        labels_file (Optional[str]): The path of the CSV file. None means unlabeled cases.
+
+    Returns:
+        Dict[str, int]: The label of every case, e.g. {'PATIENT-1_26MM': 1}.
+    """
+    if labels_file is None:
+        return {}
+
+    with open(labels_file, "r", newline="") as file:
+        return {row["case"]: int(row["label"]) for row in csv.DictReader(file)}
+
+
+def get_split_records(
+    split_dir: str, fields: List[str], labels: Dict[str, int]
+) -> List[Dict]:
+    """
+    Lists the cases of a split with the snapshot paths of every field.
+
+    Parameters:
+        split_dir (str): The split directory name, e.g. TRAIN_DIR or TEST_DIR.
+        fields (List[str]): The fields stored in every record.
+        labels (Dict[str, int]): The label of every case, missing cases get -1.
+
+    Returns:
+        List[Dict]: The records expected by `write_sharded_dataset`, sorted by case.
+    """
+    images_dir = os.path.join(DATA_DIR, IMAGES_DIR, split_dir)
+
+    # Only keep the snapshots of the patients assigned to the split
+    splits = load_split_manifest(os.path.join(DATA_DIR, MANIFESTS_DIR, SPLIT_MANIFEST))
+    images = get_split_images(
+        [
+            image
+            for image in os.listdir(os.path.join(images_dir, fields[0]))
+            if image.endswith(".png")
+        ],
+        splits,
+        "train" if split_dir == TRAIN_DIR else "test",
+    )
+
+    # Snapshots are named '<patient>_<size>_<axis>_<view>.png'
+    views = defaultdict(list)
+    for image in images:
+        views[image.rsplit("_", 2)[0]].append(image)
+
+    records = []
+    for case in sorted(views):
+        patient, size = case.rsplit("_", 1)
+        records.append(
+            {
+                "case": case,
+                "label": labels.get(case, -1),
+                "metadata": {"patient": patient, "size": size, "split": split_dir},
+                "images": {
+                    field: [
+                        os.path.join(images_dir, field, image)
+                        for image in sorted(views[case])
+                    ]
+                    for field in fields
+                },
+            }
+        )
+
+    return records
+
+
+def build_split_dataset(
+    split_dir: str,
+    fields: List[str] = FIELDS,
+    num_workers: int = NUM_WORKERS,
+    incremental: bool = INCREMENTAL,
+) -> None:
+    """
+    Packs the snapshots of a split into a sharded dataset under DATASET_DIR.
+
+    Parameters:
+        split_dir (str): The split directory name, e.g. TRAIN_DIR or TEST_DIR.
+        fields (List[str], optional): The fields stored in every record. Default is FIELDS.
+        num_workers (int, optional): The number of worker processes. Default is NUM_WORKERS.
+        incremental (bool, optional): Skip the split if its shards are up to date. Default is INCREMENTAL.
+
+    Returns:
+        None
+    """
+    dataset_dir = os.path.join(DATA_DIR, DATASET_DIR)
+    labels = load_labels(LABELS_FILE)
+    records = get_split_records(split_dir, fields, labels)
+
+    input_paths = [
+        path
+        for record in records
+        for field in fields
+        for path in record["images"][field]
+    ]
+    if LABELS_FILE is not None:
+        input_paths.append(LABELS_FILE)
+    params = {"fields": list(fields), "cases_per_shard": CASES_PER_SHARD}
+
+    manifest_path = os.path.join(
+        DATA_DIR, MANIFESTS_DIR, "dataset", DATASET_DIR, split_dir + ".json"
+    )
+    manifest = load_manifest(manifest_path)
+    if incremental and is_up_to_date(
+        manifest, input_paths, manifest.get("outputs", {}).keys(), params
+    ):
+        return
+
+    index = write_sharded_dataset(
+        dataset_dir, split_dir, records, fields, CASES_PER_SHARD, num_workers
+    )
+
+    output_paths = [os.path.join(dataset_dir, split_dir + ".json")] + [
+        os.path.join(dataset_dir, shard["path"]) for shard in index["shards"]
+    ]
+    save_manifest(manifest_path, make_manifest_entry(input_paths, output_paths, params))
+
+    # A split with fewer cases than before leaves its last shards behind
+    for path in set(manifest.get("outputs", {})) - set(output_paths):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    for split_dir in SPLITS:
+        build_split_dataset(split_dir)
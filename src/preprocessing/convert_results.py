@@ -0,0 +1,107 @@
+import os
+from functools import partial
+from utils import (
+    PRESSURE_COLUMN,
+    STRESS_COLUMN,
+    RESULT_COLUMNS_EXTENSION,
+    refresh_case_catalog,
+    get_catalog_cases,
+    get_case_file,
+    write_result_columns,
+    run_cases_in_parallel,
+    load_manifest,
+    save_manifest,
+    make_manifest_entry,
+    is_up_to_date,
+)
+
+current_file = os.path.abspath(__file__)
+current_dir = os.path.dirname(current_file)
+
+DATA_DIR = "/mnt/Data/Datasets/TAVI/"
+PATIENTS_DIR = "Patients"
+MANIFESTS_DIR = "Manifests"
+CATALOG_FILE = "catalog.json"
+NUM_WORKERS = os.cpu_count()
+INCREMENTAL = True
+
+# Result files of every case and the column to keep from each of them
+RESULT_FILES = {"CONTACT.csv": PRESSURE_COLUMN, "SPOS.csv": STRESS_COLUMN}
+
+
+def convert_case_results(
+    patient: str, size: str, incremental: bool = INCREMENTAL
+) -> None:
+    """
+    Converts the result files (.csv) of a single case to the columnar format.
+
+    Parameters:
+        patient (str): The patient directory name.
+        size (str): The size directory name of the patient.
+        incremental (bool, optional): Skip the case if its columnar files are up to date. Default is INCREMENTAL.
+
+    Returns:
+        None
+
+    Example:
+        convert_case_results("PATIENT-1", "29MM")
+    """
+    # Get the path to the patients directory
+    patients_path = os.path.join(DATA_DIR, PATIENTS_DIR)
+
+    for extension, column_name in RESULT_FILES.items():
+        # Get the path of the result file in the current size directory
+        result_path = get_case_file(patients_path, patient, size, extension)
+        columns_path = result_path + RESULT_COLUMNS_EXTENSION
+
+        # Skip the file if it was already converted from the same input
+        manifest_path = os.path.join(
+            DATA_DIR,
+            MANIFESTS_DIR,
+            "convert_results",
+            f"{patient}_{size}_{extension}.json",
+        )
+        if incremental and is_up_to_date(
+            load_manifest(manifest_path), [result_path], [columns_path]
+        ):
+            continue
+
+        # Convert the result file to the columnar format
+        write_result_columns(result_path, column_name, columns_path)
+
+        save_manifest(manifest_path, make_manifest_entry([result_path], [columns_path]))
+
+
+def convert_all_results(
+    num_workers: int = NUM_WORKERS, incremental: bool = INCREMENTAL
+) -> None:
+    """
+    Converts all result files (.csv) in the dataset to the columnar format.
+
+    Parameters:
+        num_workers (int, optional): The number of worker processes. Default is NUM_WORKERS.
+        incremental (bool, optional): Only convert result files that are out of date. Default is INCREMENTAL.
+
+    Returns:
+        None
+
+    Example:
+        convert_all_results()
+    """
+    # Get the path to the patients directory and refresh its case catalog
+    patients_path = os.path.join(DATA_DIR, PATIENTS_DIR)
+    refresh_case_catalog(
+        patients_path, os.path.join(DATA_DIR, MANIFESTS_DIR, CATALOG_FILE)
+    )
+
+    # Process every (patient, size) case over the worker pool
+    run_cases_in_parallel(
+        partial(convert_case_results, incremental=incremental),
+        get_catalog_cases(patients_path),
+        num_workers,
+        "convert_results",
+    )
+
+
+if __name__ == "__main__":
+    convert_all_results()
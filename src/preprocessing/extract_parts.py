@@ -1,63 +1,100 @@
 import os
-import tqdm
-from utils import get_file_with_extension, extract_part
+from functools import partial
+from utils import (
+    refresh_case_catalog,
+    get_catalog_cases,
+    get_case_file,
+    extract_parts_from_inp_file,
+    run_cases_in_parallel,
+    load_manifest,
+    save_manifest,
+    make_manifest_entry,
+    is_up_to_date,
+)
 
 current_file = os.path.abspath(__file__)
 current_dir = os.path.dirname(current_file)
 
 DATA_DIR = "/mnt/Data/Datasets/TAVI/"
 PATIENTS_DIR = "Patients"
+MANIFESTS_DIR = "Manifests"
+CATALOG_FILE = "catalog.json"
+NUM_WORKERS = os.cpu_count()
+INCREMENTAL = True
 
 
-def extract_part_from_inp_files() -> None:
+def extract_part_from_case(
+    patient: str, size: str, incremental: bool = INCREMENTAL
+) -> None:
     """
-    Extract parts like AORTA or STENT from inp files
+    Extract the AORTA and STENT parts from the inp file of a single case
 
     Parameters:
-        None
+        patient (str): The patient directory name.
+        size (str): The size directory name of the patient.
+        incremental (bool, optional): Skip the case if its parts are up to date. Default is INCREMENTAL.
 
     Returns:
         None
 
     Example:
-        extract_part_from_inp_files()
+        extract_part_from_case("PATIENT-1", "29MM")
     """
-    # Get the path to the patients directory
-    patients_path = os.path.join(DATA_DIR, PATIENTS_DIR)
-
-    # Get the list of patients
-    patients = os.listdir(patients_path)
-
-    # Iterate over the patients
-    for patient in tqdm.tqdm(patients):
-        # Get the path to the sizes directory for the current patient
-        sizes_path = os.path.join(patients_path, patient)
-
-        # Get the list of sizes for the current patient
-        sizes = os.listdir(sizes_path)
-
-        # Iterate over the sizes
-        for size in sizes:
-            # Get the path to the files directory for the current size
-            files_path = os.path.join(sizes_path, size)
-
-            # Get the path of the input file (.inp) in the current size directory
-            input_file_path = get_file_with_extension(files_path, "MM.inp")
-
-            # Read input fiel
-            with open(input_file_path, "r") as file:
-                input_data = file.read()
+    # Get the path of the input file (.inp) in the current size directory
+    input_file_path = get_case_file(
+        os.path.join(DATA_DIR, PATIENTS_DIR), patient, size, "MM.inp"
+    )
+
+    part_paths = {
+        "AORTA": input_file_path + "AORTA_PRE.inp",
+        "STENT": input_file_path + "STENT_PRE.inp",
+    }
+
+    # Skip the case if the parts were already extracted from the same input
+    manifest_path = os.path.join(
+        DATA_DIR, MANIFESTS_DIR, "extract_parts", f"{patient}_{size}.json"
+    )
+    output_paths = list(part_paths.values())
+    if incremental and is_up_to_date(
+        load_manifest(manifest_path), [input_file_path], output_paths
+    ):
+        return
+
+    # Stream the aorta and stent parts to their files in a single pass
+    extract_parts_from_inp_file(input_file_path, part_paths)
+
+    save_manifest(manifest_path, make_manifest_entry([input_file_path], output_paths))
+
+
+def extract_part_from_inp_files(
+    num_workers: int = NUM_WORKERS, incremental: bool = INCREMENTAL
+) -> None:
+    """
+    Extract parts like AORTA or STENT from inp files
 
-            # Get aorta
-            aorta = extract_part(input_data, "AORTA")
-            stent = extract_part(input_data, "STENT")
+    Parameters:
+        num_workers (int, optional): The number of worker processes. Default is NUM_WORKERS.
+        incremental (bool, optional): Only process cases whose parts are out of date. Default is INCREMENTAL.
 
-            # Write Files
-            with open(input_file_path + "AORTA_PRE.inp", "w") as output_file:
-                output_file.write(aorta)
+    Returns:
+        None
 
-            with open(input_file_path + "STENT_PRE.inp", "w") as output_file:
-                output_file.write(stent)
+    Example:
+        extract_part_from_inp_files()
+    """
+    # Get the path to the patients directory and refresh its case catalog
+    patients_path = os.path.join(DATA_DIR, PATIENTS_DIR)
+    refresh_case_catalog(
+        patients_path, os.path.join(DATA_DIR, MANIFESTS_DIR, CATALOG_FILE)
+    )
+
+    # Process every (patient, size) case over the worker pool
+    run_cases_in_parallel(
+        partial(extract_part_from_case, incremental=incremental),
+        get_catalog_cases(patients_path),
+        num_workers,
+        "extract_parts",
+    )
 
 
 if __name__ == "__main__":
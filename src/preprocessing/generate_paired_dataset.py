@@ -1,6 +1,8 @@
 import os
-from PIL import Image
-from tqdm import tqdm
+import cv2
+import numpy as np
+from functools import partial
+from typing import Dict, List, Tuple
 
 from utils import *
 
@@ -9,58 +11,323 @@ IMAGES_DIR = "Images-new"
 PAIRED_DIR = "Paired-Images-Stress"
 TRAIN_DIR = "Train"
 TEST_DIR = "Test"
+SPLITS = [TRAIN_DIR, TEST_DIR]
 INPUT_DIR = "Raw"
 PRESSURE_DIR = "Pressure"
 STRESS_DIR = "Stress"
+TARGET_DIR = STRESS_DIR
+MANIFESTS_DIR = "Manifests"
+SPLIT_MANIFEST = "splits.json"
+NUM_WORKERS = os.cpu_count()
+INCREMENTAL = True
+PACKED = False
+PAIRS_PER_TASK = 64
+
+
+def read_pair(image1: str, image2: str, out: np.ndarray = None) -> np.ndarray:
+    """
+    Decodes two images and places them side by side in a single array.
+
+    Parameters:
+        image1 (str): The path of the left image.
+        image2 (str): The path of the right image.
+        out (np.ndarray, optional): A preallocated (H, W1 + W2, 3) uint8 buffer. Default is None.
+
+    Returns:
+        np.ndarray: The (H, W1 + W2, 3) BGR pair.
+
+    Raises:
+        ValueError: If an image cannot be read, the heights of the images differ or
+            the pair does not have the shape of out.
+    """
+    left = cv2.imread(image1, cv2.IMREAD_COLOR)
+    right = cv2.imread(image2, cv2.IMREAD_COLOR)
+    if left is None or right is None:
+        raise ValueError(f"Cannot read {image1 if left is None else image2}")
+    if left.shape[0] != right.shape[0]:
+        raise ValueError(f"{image1} and {image2} have different heights")
+
+    width = left.shape[1]
+    shape = (left.shape[0], width + right.shape[1], 3)
+    if out is None:
+        out = np.empty(shape, dtype=np.uint8)
+    elif out.shape != shape:
+        raise ValueError(
+            f"{image1} and {image2} make a {shape} pair, expected {out.shape}"
+        )
+    out[:, :width] = left
+    out[:, width:] = right
+    return out
 
 
 def create_pair(image1: str, image2: str, save_path: str):
-    image1 = Image.open(image1)
-    image2 = Image.open(image2)
-    new_image = Image.new("RGB", (image1.width + image2.width, image1.height))
-    new_image.paste(image1, (0, 0))
-    new_image.paste(image2, (image1.width, 0))
-    new_image.save(save_path)
+    cv2.imwrite(save_path, read_pair(image1, image2))
+
+
+def _create_pairs(
+    images: Tuple[str], input_dir: str, target_dir: str, pairs_dir: str
+) -> Dict[str, str]:
+    """
+    Creates the paired images of a task as loose PNG files.
+
+    A pair that cannot be created does not stop the other pairs of the task.
+
+    Parameters:
+        images (Tuple[str]): The names of the images, shared by the input, target and pair.
+        input_dir (str): The directory of the input (left) images.
+        target_dir (str): The directory of the target (right) images.
+        pairs_dir (str): The directory the pairs are written to.
+
+    Returns:
+        Dict[str, str]: The error of every image whose pair failed.
+    """
+    errors = {}
+    for image in images:
+        try:
+            create_pair(
+                os.path.join(input_dir, image),
+                os.path.join(target_dir, image),
+                os.path.join(pairs_dir, image),
+            )
+        except Exception as exception:
+            errors[image] = f"{type(exception).__name__}: {exception}"
+    return errors
+
+
+def _pack_pairs(
+    rows: Tuple[int],
+    images: Tuple[str],
+    input_dir: str,
+    target_dir: str,
+    shard_path: str,
+) -> Dict[str, str]:
+    """
+    Writes the paired images of a task into their rows of the packed shard.
+
+    A pair that cannot be read, or does not have the shape of the rows of the shard,
+    leaves its row unwritten without stopping the other pairs of the task.
+
+    Parameters:
+        rows (Tuple[int]): The row of every image in the shard.
+        images (Tuple[str]): The names of the images, shared by the input and target.
+        input_dir (str): The directory of the input (left) images.
+        target_dir (str): The directory of the target (right) images.
+        shard_path (str): The path of the preallocated (N, H, 2W, 3) shard (.npy).
+
+    Returns:
+        Dict[str, str]: The error of every image whose pair failed.
+    """
+    # Every task writes its own rows of the shard
+    shard = np.load(shard_path, mmap_mode="r+")
+    errors = {}
+    for row, image in zip(rows, images):
+        try:
+            read_pair(
+                os.path.join(input_dir, image),
+                os.path.join(target_dir, image),
+                out=shard[row],
+            )
+        except Exception as exception:
+            errors[image] = f"{type(exception).__name__}: {exception}"
+    shard.flush()
+    return errors
+
+
+def _get_tasks(items: List, size: int = PAIRS_PER_TASK) -> List[Tuple]:
+    """
+    Splits items into tasks, so that every worker call handles several of them.
+
+    Parameters:
+        items (List): The items to split.
+        size (int, optional): The maximum number of items per task. Default is PAIRS_PER_TASK.
+
+    Returns:
+        List[Tuple]: The items of every task, in order.
+    """
+    return [tuple(items[i : i + size]) for i in range(0, len(items), size)]
+
+
+def get_packed_paths(split_dir: str) -> Tuple[str, str]:
+    """
+    Returns the paths of the packed shard and of its index for a split.
+
+    Parameters:
+        split_dir (str): The split directory name, e.g. TRAIN_DIR or TEST_DIR.
+
+    Returns:
+        Tuple[str, str]: The shard (.npy) path and the index (.json) path.
+    """
+    pairs_dir = os.path.join(DATA_DIR, PAIRED_DIR)
+    return (
+        os.path.join(pairs_dir, split_dir + ".npy"),
+        os.path.join(pairs_dir, split_dir + ".json"),
+    )
+
+
+def load_packed_pairs(split_dir: str) -> Tuple[np.ndarray, List[str], np.ndarray]:
+    """
+    Opens the packed pairs of a split for random access.
+
+    Parameters:
+        split_dir (str): The split directory name, e.g. TRAIN_DIR or TEST_DIR.
+
+    Returns:
+        Tuple[np.ndarray, List[str], np.ndarray]: The read-only (N, H, 2W, 3) BGR memory map,
+        the image names of its rows and the (N,) bool mask of the rows holding a pair.
+        The rows of the pairs that failed are left black.
+
+    Example:
+        pairs, names, valid = load_packed_pairs(TRAIN_DIR)
+        pairs, names = pairs[valid], [name for name, ok in zip(names, valid) if ok]
+    """
+    shard_path, index_path = get_packed_paths(split_dir)
+    index = load_manifest(index_path)
+    valid = np.array(index.get("valid", [False] * len(index["names"])), dtype=bool)
+    return np.load(shard_path, mmap_mode="r"), index["names"], valid
+
+
+def create_split_pairs(
+    split_dir: str,
+    num_workers: int = NUM_WORKERS,
+    incremental: bool = INCREMENTAL,
+    packed: bool = PACKED,
+) -> None:
+    """
+    Creates the paired images of a split, pairing every input image with its target.
+
+    The pairs are written as loose PNG files, or packed into a single memory-mappable
+    (N, H, 2W, 3) array with an index of the image names when packed is True.
+
+    Parameters:
+        split_dir (str): The split directory name, e.g. TRAIN_DIR or TEST_DIR.
+        num_workers (int, optional): The number of worker processes. Default is NUM_WORKERS.
+        incremental (bool, optional): Only create pairs whose inputs changed. Default is INCREMENTAL.
+        packed (bool, optional): Write the pairs into a packed shard. Default is PACKED.
+
+    Returns:
+        None
+    """
+    images_dir = os.path.join(DATA_DIR, IMAGES_DIR, split_dir)
+    input_dir = os.path.join(images_dir, INPUT_DIR)
+    target_dir = os.path.join(images_dir, TARGET_DIR)
+    pairs_dir = os.path.join(DATA_DIR, PAIRED_DIR, split_dir)
+    shard_path, index_path = get_packed_paths(split_dir)
+
+    # The manifest records the inputs of every pair created in this split
+    manifest_path = os.path.join(
+        DATA_DIR,
+        MANIFESTS_DIR,
+        "pairs",
+        PAIRED_DIR,
+        split_dir + (".packed" if packed else "") + ".json",
+    )
+    # Only pair the snapshots of the patients assigned to the split
+    splits = load_split_manifest(os.path.join(DATA_DIR, MANIFESTS_DIR, SPLIT_MANIFEST))
+    input_images = get_split_images(
+        sorted(os.listdir(input_dir)),
+        splits,
+        "train" if split_dir == TRAIN_DIR else "test",
+    )
+    input_paths = {
+        image: [os.path.join(input_dir, image), os.path.join(target_dir, image)]
+        for image in input_images
+    }
+
+    # Forget the pairs whose input image was removed
+    manifest = load_manifest(manifest_path) if incremental else {}
+    manifest = {image: manifest[image] for image in input_images if image in manifest}
+
+    if packed:
+        # The shard is reused when it still holds the same images
+        first_pair = read_pair(*input_paths[input_images[0]]) if input_images else None
+        shape = (len(input_images),) + (first_pair.shape if input_images else ())
+        index = load_manifest(index_path)
+        if not (
+            incremental
+            and os.path.exists(shard_path)
+            and index.get("names") == input_images
+            and tuple(index.get("shape", ())) == shape
+        ):
+            os.makedirs(os.path.dirname(shard_path), exist_ok=True)
+            np.lib.format.open_memmap(
+                shard_path, mode="w+", dtype=np.uint8, shape=shape
+            ).flush()
+            save_manifest(index_path, {"names": input_images, "shape": shape})
+            manifest = {}
+        output_paths = {image: [] for image in input_images}
+    else:
+        if incremental:
+            os.makedirs(pairs_dir, exist_ok=True)
+        else:
+            clean_dir(pairs_dir)
+        output_paths = {
+            image: [os.path.join(pairs_dir, image)] for image in input_images
+        }
+
+    pending = [
+        image
+        for image in input_images
+        if not is_up_to_date(
+            manifest.get(image), input_paths[image], output_paths[image]
+        )
+    ]
+
+    if packed:
+        rows = {image: row for row, image in enumerate(input_images)}
+        tasks = [
+            (tuple(rows[image] for image in images), images)
+            for images in _get_tasks(pending)
+        ]
+        func = partial(
+            _pack_pairs,
+            input_dir=input_dir,
+            target_dir=target_dir,
+            shard_path=shard_path,
+        )
+    else:
+        tasks = [(images,) for images in _get_tasks(pending)]
+        func = partial(
+            _create_pairs,
+            input_dir=input_dir,
+            target_dir=target_dir,
+            pairs_dir=pairs_dir,
+        )
+
+    stage = f"pairs ({split_dir})"
+    results = {}
+    failures = run_cases_in_parallel(func, tasks, num_workers, stage, results)
+
+    # Record the pairs that succeeded, loose failed pairs keep their previous entry if any
+    failed = {image for task, _ in failures for image in task[-1]}
+    for errors in results.values():
+        for image, error in errors.items():
+            print(f"[{stage}] {image} failed: {error}")
+            failed.add(image)
+    for image in pending:
+        if image in failed:
+            if packed:
+                # The row of a stale pair may have been partially overwritten
+                manifest.pop(image, None)
+        else:
+            manifest[image] = make_manifest_entry(
+                input_paths[image], output_paths[image]
+            )
+
+    save_manifest(manifest_path, manifest)
+
+    if packed:
+        # Only the rows of the recorded pairs hold a pair
+        index = load_manifest(index_path)
+        index["valid"] = [image in manifest for image in input_images]
+        save_manifest(index_path, index)
+
+    if incremental and not packed:
+        prune_outputs(
+            pairs_dir,
+            [path for entry in manifest.values() for path in entry["outputs"]],
+        )
 
 
 if __name__ == "__main__":
-    images_dir = os.path.join(DATA_DIR, IMAGES_DIR)
-    paired_images_dir = os.path.join(DATA_DIR, PAIRED_DIR)
-
-    # Process train images
-    train_dir = os.path.join(images_dir, TRAIN_DIR)
-    train_INPUT_DIR = os.path.join(train_dir, INPUT_DIR)
-    train_pressure_dir = os.path.join(train_dir, PRESSURE_DIR)
-    train_stress_dir = os.path.join(train_dir, STRESS_DIR)
-    train_pairs_dir = os.path.join(paired_images_dir, TRAIN_DIR)
-    clean_dir(train_pairs_dir)
-
-    curvature_images = os.listdir(train_INPUT_DIR)
-
-    for image in tqdm(curvature_images):
-        image_path = os.path.join(train_INPUT_DIR, image)
-        pressure_image_path = os.path.join(train_pressure_dir, image)
-        stress_image_path = os.path.join(train_stress_dir, image)
-
-        save_path = os.path.join(train_pairs_dir, image)
-        # create_pair(image_path, pressure_image_path, save_path)
-        create_pair(image_path, stress_image_path, save_path)
-
-    # Process test images
-    test_dir = os.path.join(images_dir, TEST_DIR)
-    test_INPUT_DIR = os.path.join(test_dir, INPUT_DIR)
-    test_pressure_dir = os.path.join(test_dir, PRESSURE_DIR)
-    test_stress_dir = os.path.join(test_dir, STRESS_DIR)
-    test_pairs_dir = os.path.join(paired_images_dir, TEST_DIR)
-    clean_dir(test_pairs_dir)
-
-    curvature_images = os.listdir(test_INPUT_DIR)
-
-    for image in tqdm(curvature_images):
-        image_path = os.path.join(test_INPUT_DIR, image)
-        pressure_image_path = os.path.join(test_pressure_dir, image)
-        stress_image_path = os.path.join(test_stress_dir, image)
-
-        save_path = os.path.join(test_pairs_dir, image)
-        # create_pair(image_path, pressure_image_path, save_path)
-        create_pair(image_path, stress_image_path, save_path)
+    for split_dir in SPLITS:
+        create_split_pairs(split_dir)
@@ -1,20 +1,23 @@
 import os
-import random
+import json
 import numpy as np
 import pyvista as pv
-from tqdm import tqdm
-from typing import List, Tuple, Literal
+from functools import partial
+from typing import Dict, List, Tuple, Literal
 
 from utils import *
 
-random.seed(1)
-
 current_file = os.path.abspath(__file__)
 current_dir = os.path.dirname(current_file)
 
 DATA_DIR = "/mnt/Data/Datasets/TAVI/"
 PATIENTS_DIR = "Patients"
 IMAGES_DIR = "Images-new"
+CACHE_DIR = "Cache"
+MANIFESTS_DIR = "Manifests"
+CATALOG_FILE = "catalog.json"
+SPLIT_MANIFEST = "splits.json"
+MESH_EXTENSION = ".vtu"
 TRAIN_DIR = "Train"
 TEST_DIR = "Test"
 
@@ -27,91 +30,371 @@ GEOMETRY_TRANSFORMATIONS = ["Raw"]
 PRESSURE_LIM = [0.0, 0.4]
 STRESS_LIM = [0.0, 0.5]
 CURVATURE_LIM = [0.0, 0.05]
+CURVATURE_TYPE = "gaussian"
+CURVATURE_BACKEND = "vtk"
+NUM_WORKERS = os.cpu_count()
+INCREMENTAL = True
+# "direct" renders colored snapshots, "lut" renders the scalars once and colors them
+RENDER_MODE = "direct"
+# Also save the pixel to aorta point maps of every case, for back-projecting predictions
+PIXEL_MAPS = False
+PIXEL_MAPS_DIR = "Pixel-Maps"
 
 
 def get_train_test_patients(
     patients_dir: str, train_percentage: float
 ) -> Tuple[List[str], List[str]]:
+    """
+    Returns the train and test patients, keeping the splits recorded in the split manifest.
+
+    Parameters:
+        patients_dir (str): The directory containing one folder per patient.
+        train_percentage (float): The expected fraction of new patients assigned to train.
+
+    Returns:
+        Tuple[List[str], List[str]]: The train and test patients.
+    """
     all_patients = os.listdir(patients_dir)
-    random.shuffle(all_patients)
-    train_size = round(len(all_patients) * train_percentage)
-    train_patients, test_patients = all_patients[:train_size], all_patients[train_size:]
-    return (train_patients, test_patients)
+    manifest_path = os.path.join(DATA_DIR, MANIFESTS_DIR, SPLIT_MANIFEST)
 
+    # Patients rendered before the manifest existed keep the split of their snapshots
+    previous_splits = None
+    if not os.path.exists(manifest_path):
+        previous_splits = get_image_splits(os.path.join(DATA_DIR, IMAGES_DIR))
 
-def generate_images(
-    patients: List[str], transformation: str, mode: Literal["train", "test"]
-):
-    for patient in patients:
-        patient_path = os.path.join(DATA_DIR, PATIENTS_DIR, patient)
-        sizes = os.listdir(patient_path)
-        for size in sizes:
-            files_path = os.path.join(patient_path, size)
-            input_file = get_file_with_extension(files_path, "AORTA.inp")
-            pressure_file = get_file_with_extension(files_path, "CONTACT.csv")
-            stress_file = get_file_with_extension(files_path, "SPOS.csv")
-            aorta_file = get_file_with_extension(files_path, "AORTA_PRE.inp.vtk")
-            stent_file = get_file_with_extension(files_path, "STENT_PRE.inp.vtk")
-
-            aorta = pv.read(aorta_file)
-            stent = pv.read(stent_file)
-            combined = stent + aorta
-
-            point_data = None
+    splits = update_split_manifest(
+        manifest_path, all_patients, train_percentage, previous_splits
+    )
+    return get_split_patients(splits, all_patients)
+
+
+def get_image_splits(images_dir: str) -> Dict[str, str]:
+    """
+    Returns the split of the patients whose snapshots are in the train or test directory.
+
+    Parameters:
+        images_dir (str): The directory holding the TRAIN_DIR and TEST_DIR snapshots.
+
+    Returns:
+        Dict[str, str]: The split ('train' or 'test') of every patient found in a
+        single split, patients found in both are left out.
+    """
+    found = {}
+    for split_dir, split in [(TRAIN_DIR, "train"), (TEST_DIR, "test")]:
+        split_path = os.path.join(images_dir, split_dir)
+        if not os.path.isdir(split_path):
+            continue
+
+        for transformation in os.listdir(split_path):
+            transformation_path = os.path.join(split_path, transformation)
+            if not os.path.isdir(transformation_path):
+                continue
+            # Snapshots are named '<patient>_<size>_<axis>_<view>.png'
+            for image in os.listdir(transformation_path):
+                if image.endswith(".png"):
+                    found.setdefault(image.rsplit("_", 3)[0], set()).add(split)
+
+    return {
+        patient: splits.pop() for patient, splits in found.items() if len(splits) == 1
+    }
+
+
+def get_cached_node_index(input_file: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the node label lookup of an aorta, reusing it from the cache if available.
+
+    Parameters:
+        input_file (str): The file path of the aorta input file in 'inp' format.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The lookup returned by `get_node_index`.
+    """
+
+    def compute():
+        labels, _ = read_inp_nodes(input_file)
+        sorted_labels, order = get_node_index(labels)
+        return {"labels": sorted_labels, "order": order}
+
+    arrays = cached_arrays(
+        os.path.join(DATA_DIR, CACHE_DIR), "node_index", [input_file], compute
+    )
+    return arrays["labels"], arrays["order"]
+
+
+def get_result(
+    transformation: Literal["Pressure", "Stress"], result_file: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the nodal result of a case from its columnar file, converting it if needed.
+
+    Parameters:
+        transformation (Literal["Pressure", "Stress"]): The kind of result to read.
+        result_file (str): The file path of the CONTACT or SPOS result file.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The node labels and the corresponding values.
+    """
+    column_name = PRESSURE_COLUMN if transformation == "Pressure" else STRESS_COLUMN
+
+    # The conversion normally happens once in convert_results.py
+    columns_file = result_file + RESULT_COLUMNS_EXTENSION
+    is_stale = not os.path.exists(columns_file) or (
+        os.path.getmtime(columns_file) < os.path.getmtime(result_file)
+    )
+    if is_stale:
+        write_result_columns(result_file, column_name, columns_file)
+
+    return (
+        read_result_column(columns_file, "Node"),
+        read_result_column(columns_file, "Value"),
+    )
+
+
+def generate_case_images(
+    patient: str,
+    size: str,
+    transformations: List[str],
+    mode: Literal["train", "test"],
+    incremental: bool = INCREMENTAL,
+) -> None:
+    patients_path = os.path.join(DATA_DIR, PATIENTS_DIR)
+    input_file = get_case_file(patients_path, patient, size, "AORTA.inp")
+    pressure_file = get_case_file(patients_path, patient, size, "CONTACT.csv")
+    stress_file = get_case_file(patients_path, patient, size, "SPOS.csv")
+    aorta_file = get_case_file(
+        patients_path, patient, size, "AORTA_PRE.inp" + MESH_EXTENSION
+    )
+    stent_file = get_case_file(
+        patients_path, patient, size, "STENT_PRE.inp" + MESH_EXTENSION
+    )
+
+    filename = patient + "_" + size
+    split_dir = TRAIN_DIR if mode == "train" else TEST_DIR
+
+    # Snapshots are colored again whenever the colormap changes
+    cmap_fingerprint = get_cmap_fingerprint()
+
+    # Find the transformations whose snapshots are out of date
+    pending, all_input_paths = {}, {}
+    for transformation in transformations:
+        save_path = os.path.join(
+            DATA_DIR, IMAGES_DIR, split_dir, transformation, filename
+        )
+
+        clim = None
+        if transformation == "Pressure":
+            clim = PRESSURE_LIM
+        elif transformation == "Stress":
+            clim = STRESS_LIM
+        else:
+            clim = CURVATURE_LIM
+
+        input_paths = [aorta_file, stent_file]
+        if transformation == "Pressure":
+            input_paths += [input_file, pressure_file]
+        elif transformation == "Stress":
+            input_paths += [input_file, stress_file]
+        all_input_paths[transformation] = input_paths
+        output_paths = get_snapshot_paths(save_path)
+        params = {"transformation": transformation, "clim": clim}
+        params.update(cmap=cmap_fingerprint)
+        if transformation == "Curvature":
+            params.update(curvature=CURVATURE_TYPE, backend=CURVATURE_BACKEND)
+        if RENDER_MODE == "lut":
+            params.update(render_mode=RENDER_MODE)
+        manifest_path = os.path.join(
+            DATA_DIR,
+            MANIFESTS_DIR,
+            "snapshots",
+            mode,
+            transformation,
+            filename + ".json",
+        )
+        if incremental and is_up_to_date(
+            load_manifest(manifest_path), input_paths, output_paths, params
+        ):
+            continue
+
+        pending[transformation] = (save_path, clim, input_paths, params, manifest_path)
+
+    # The pixel maps only depend on the meshes
+    maps_path = os.path.join(DATA_DIR, PIXEL_MAPS_DIR, split_dir, filename + ".npz")
+    maps_manifest_path = os.path.join(
+        DATA_DIR, MANIFESTS_DIR, "pixel_maps", mode, filename + ".json"
+    )
+    maps_pending = PIXEL_MAPS and not (
+        incremental
+        and is_up_to_date(
+            load_manifest(maps_manifest_path), [aorta_file, stent_file], [maps_path]
+        )
+    )
+
+    if not pending and not maps_pending:
+        return
+
+    # Load the geometry once for all transformations
+    cache_dir = os.path.join(DATA_DIR, CACHE_DIR)
+    aorta = read_mesh(aorta_file, cache_dir)
+    stent = read_mesh(stent_file, cache_dir)
+
+    def attach_point_data(names: List[str]) -> pv.DataSet:
+        # Attach the point data to each part, combining them keeps the arrays aligned
+        node_index = None
+        for transformation in names:
+            aorta_data = np.zeros((aorta.n_points))
+            stent_data = np.zeros((stent.n_points))
 
             if transformation == "Curvature":
-                point_data = np.concatenate(
-                    [aorta.curvature(curv_type="gaussian"), np.zeros((stent.n_points))]
-                )
+                aorta_data = get_curvatures(
+                    aorta, aorta_file, cache_dir, CURVATURE_BACKEND
+                )[CURVATURE_TYPE]
 
-            elif transformation == "Pressure":
-                result = get_pressure_result(input_file, pressure_file)
-                point_data = np.pad(
-                    result["Value"].to_numpy(),
-                    (0, combined.n_points - aorta.n_points),
-                    "constant",
-                )
+            elif transformation in ("Pressure", "Stress"):
+                if node_index is None:
+                    node_index = get_cached_node_index(input_file)
+                    if len(node_index[0]) != aorta.n_points:
+                        raise ValueError(
+                            f"{input_file} has {len(node_index[0])} nodes "
+                            f"but {aorta_file} has {aorta.n_points} points"
+                        )
 
-            elif transformation == "Stress":
-                result = get_stress_result(input_file, stress_file)
-                point_data = np.pad(
-                    result["Value"].to_numpy(),
-                    (0, combined.n_points - aorta.n_points),
-                    "constant",
+                result_file = (
+                    pressure_file if transformation == "Pressure" else stress_file
+                )
+                aorta_data = map_nodal_values(
+                    node_index, *get_result(transformation, result_file)
                 )
 
             elif transformation == "Raw":
-                point_data = np.concatenate(
-                    [np.zeros((aorta.n_points)), 0.025 * np.ones((stent.n_points))]
-                )
+                stent_data = 0.025 * np.ones((stent.n_points))
 
-            try:
-                combined.point_data[transformation] = point_data
-            except Exception as e:
-                print(e)
-                print(aorta_file)
-
-            save_path = None
-            filename = patient + "_" + size
-            if mode == "train":
-                save_path = os.path.join(
-                    DATA_DIR, IMAGES_DIR, TRAIN_DIR, transformation, filename
-                )
-            else:
-                save_path = os.path.join(
-                    DATA_DIR, IMAGES_DIR, TEST_DIR, transformation, filename
-                )
+            aorta.point_data[transformation] = aorta_data
+            stent.point_data[transformation] = stent_data
 
-            clim = None
-            if transformation == "Pressure":
-                clim = PRESSURE_LIM
-            elif transformation == "Stress":
-                clim = STRESS_LIM
-            else:
-                clim = CURVATURE_LIM
-            generate_rotating_snapshots(combined, save_path, clim)
+        return stent + aorta
+
+    if maps_pending:
+        # The aorta points follow the stent points in the combined geometry
+        combined = stent + aorta
+        maps = render_rotating_pixel_maps(
+            combined, point_range=(stent.n_points, combined.n_points)
+        )
+        save_pixel_maps(maps_path, maps)
+        save_manifest(
+            maps_manifest_path,
+            make_manifest_entry([aorta_file, stent_file], [maps_path]),
+        )
 
-        yield
+    if not pending:
+        return
+
+    # Render every transformation by only swapping the active scalars
+    fields = {
+        transformation: clim for transformation, (_, clim, _, _, _) in pending.items()
+    }
+    if RENDER_MODE == "lut":
+        # The scalar views of every transformation are cached together, so any
+        # stale subset of them, new color ranges or colormaps only recolor them
+        render_params = {
+            "fields": sorted(transformations),
+            "curvature": [CURVATURE_TYPE, CURVATURE_BACKEND],
+        }
+        scalar_views = cached_arrays(
+            cache_dir,
+            "scalar_views." + json.dumps(render_params, sort_keys=True),
+            sorted({path for paths in all_input_paths.values() for path in paths}),
+            lambda: render_rotating_scalar_views(
+                attach_point_data(transformations), sorted(transformations)
+            ),
+        )
+        views = {
+            transformation: colorize_views(
+                scalar_views["scalars." + transformation],
+                scalar_views["shading"],
+                scalar_views["coverage"],
+                clim,
+            )
+            for transformation, clim in fields.items()
+        }
+    else:
+        views = render_rotating_field_views(attach_point_data(list(pending)), fields)
+
+    for transformation in fields:
+        save_path, _, input_paths, params, manifest_path = pending[transformation]
+        save_snapshots(views[transformation], save_path)
+        save_manifest(
+            manifest_path,
+            make_manifest_entry(input_paths, get_snapshot_paths(save_path), params),
+        )
+
+
+def generate_images(
+    patients: List[str],
+    transformations: List[str],
+    mode: Literal["train", "test"],
+    num_workers: int = NUM_WORKERS,
+    incremental: bool = INCREMENTAL,
+) -> None:
+    patients_path = os.path.join(DATA_DIR, PATIENTS_DIR)
+    refresh_case_catalog(
+        patients_path, os.path.join(DATA_DIR, MANIFESTS_DIR, CATALOG_FILE)
+    )
+    cases = get_catalog_cases(patients_path, patients)
+    run_cases_in_parallel(
+        partial(
+            generate_case_images,
+            transformations=transformations,
+            mode=mode,
+            incremental=incremental,
+        ),
+        cases,
+        num_workers,
+        f"{', '.join(transformations)} ({mode})",
+    )
+
+    if incremental:
+        prune_images(cases, transformations, mode)
+
+
+def prune_images(
+    cases: List[Tuple[str, str]],
+    transformations: List[str],
+    mode: Literal["train", "test"],
+) -> None:
+    """
+    Deletes the snapshots and pixel maps of a split that no current case produced.
+
+    The manifests of cases that were removed, or whose patient moved to the other
+    split, are deleted first. Files without a remaining manifest entry are then
+    removed, including the outputs of runs that predate the manifests.
+
+    Parameters:
+        cases (List[Tuple[str, str]]): The (patient, size) cases of the split.
+        transformations (List[str]): The transformations rendered for the split.
+        mode (Literal["train", "test"]): The split of the cases.
+
+    Returns:
+        None
+    """
+    split_dir = TRAIN_DIR if mode == "train" else TEST_DIR
+    manifest_names = [f"{patient}_{size}.json" for patient, size in cases]
+    manifests_dir = os.path.join(DATA_DIR, MANIFESTS_DIR)
+
+    for transformation in transformations:
+        output_paths = prune_manifests(
+            os.path.join(manifests_dir, "snapshots", mode, transformation),
+            manifest_names,
+        )
+        prune_outputs(
+            os.path.join(DATA_DIR, IMAGES_DIR, split_dir, transformation),
+            output_paths,
+        )
+
+    if PIXEL_MAPS:
+        output_paths = prune_manifests(
+            os.path.join(manifests_dir, "pixel_maps", mode), manifest_names
+        )
+        prune_outputs(os.path.join(DATA_DIR, PIXEL_MAPS_DIR, split_dir), output_paths)
 
 
 if __name__ == "__main__":
@@ -121,15 +404,15 @@ if __name__ == "__main__":
     )
 
     for transformation in GEOMETRY_TRANSFORMATIONS:
-        clean_dir(os.path.join(DATA_DIR, IMAGES_DIR, TRAIN_DIR, transformation))
-        clean_dir(os.path.join(DATA_DIR, IMAGES_DIR, TEST_DIR, transformation))
-        train_generator = generate_images(train_patients, transformation, "train")
-        for _ in tqdm(range(len(train_patients))):
-            next(train_generator)
-
-        #     break
-        # break
-
-        test_generator = generate_images(test_patients, transformation, "test")
-        for _ in tqdm(range(len(test_patients))):
-            next(test_generator)
+        for split_dir in [TRAIN_DIR, TEST_DIR]:
+            transformation_dir = os.path.join(
+                DATA_DIR, IMAGES_DIR, split_dir, transformation
+            )
+            if INCREMENTAL:
+                os.makedirs(transformation_dir, exist_ok=True)
+            else:
+                clean_dir(transformation_dir)
+
+    # All transformations of a case are rendered from a single geometry load
+    generate_images(train_patients, GEOMETRY_TRANSFORMATIONS, "train")
+    generate_images(test_patients, GEOMETRY_TRANSFORMATIONS, "test")
@@ -1,7 +1,24 @@
 import os
 import meshio
-import tqdm
-from utils import get_file_with_extension, extract_part
+import numpy as np
+import pyvista as pv
+from functools import partial
+from typing import List
+from utils import (
+    ELEMENT_TYPES,
+    UnsupportedElementError,
+    read_inp_nodes,
+    read_inp_elements,
+    get_node_index,
+    refresh_case_catalog,
+    get_catalog_cases,
+    get_case_file,
+    run_cases_in_parallel,
+    load_manifest,
+    save_manifest,
+    make_manifest_entry,
+    is_up_to_date,
+)
 
 current_file = os.path.abspath(__file__)
 current_dir = os.path.dirname(current_file)
@@ -9,14 +26,73 @@ current_dir = os.path.dirname(current_file)
 # DATA_DIR = os.path.join(current_dir, "../../data/dataset")
 DATA_DIR = "/mnt/Data/Datasets/TAVI/"
 PATIENTS_DIR = "Patients"
+MANIFESTS_DIR = "Manifests"
+CATALOG_FILE = "catalog.json"
+NUM_WORKERS = os.cpu_count()
+INCREMENTAL = True
 
+# Parts converted for every case and the format they are written in
+INP_EXTENSIONS = ["AORTA_PRE.inp", "STENT_PRE.inp"]
+VTK_EXTENSION = ".vtu"
 
-def convert_inp_to_vtk(inp_file_path: str) -> None:
+
+def read_inp_mesh(inp_file_path: str) -> pv.UnstructuredGrid:
+    """
+    Reads the nodes and elements of an input file (.inp) into an unstructured grid.
+
+    Only the node and element sections are decoded, the points keep the order of
+    the '*Node' section like meshio does.
+
+    Parameters:
+        inp_file_path (str): The path of the input file.
+
+    Returns:
+        pv.UnstructuredGrid: The mesh.
+
+    Raises:
+        UnsupportedElementError: If the file has an element type missing from ELEMENT_TYPES.
+        ValueError: If an element references a node that does not exist.
+
+    Example:
+        mesh = read_inp_mesh('input_file.inp')
+    """
+    labels, points = read_inp_nodes(inp_file_path)
+    sorted_labels, order = get_node_index(labels)
+
+    cells, celltypes = [], []
+    for element_type, connectivity in read_inp_elements(inp_file_path):
+        # Map the node labels of the elements to point indices
+        positions = np.searchsorted(sorted_labels, connectivity)
+        positions = np.minimum(positions, len(sorted_labels) - 1)
+        if not np.array_equal(sorted_labels[positions], connectivity):
+            raise ValueError(f"Elements of {inp_file_path} reference missing nodes")
+
+        num_elements, num_nodes = connectivity.shape
+        sizes = np.full((num_elements, 1), num_nodes, dtype=np.int64)
+        cells.append(np.hstack([sizes, order[positions]]).ravel())
+        celltypes.append(
+            np.full(num_elements, ELEMENT_TYPES[element_type][1], np.uint8)
+        )
+
+    return pv.UnstructuredGrid(
+        np.concatenate(cells) if cells else np.empty(0, dtype=np.int64),
+        np.concatenate(celltypes) if celltypes else np.empty(0, dtype=np.uint8),
+        points,
+    )
+
+
+def convert_inp_to_vtk(inp_file_path: str, extension: str = VTK_EXTENSION) -> None:
     """
     Converts an input file (.inp) to the VTK format.
 
+    The nodes and elements are decoded directly when all element types are known,
+    otherwise the conversion falls back to meshio. With the '.vtu' extension the
+    mesh is written as compressed binary XML, which loads much faster than the
+    legacy '.vtk' format.
+
     Parameters:
         inp_file_path (str): The path of the input file.
+        extension (str, optional): The extension of the output file. Default is VTK_EXTENSION.
 
     Returns:
         None
@@ -24,51 +100,107 @@ def convert_inp_to_vtk(inp_file_path: str) -> None:
     Example:
         convert_inp_to_vtk('input_file.inp')
     """
-    # Read the input file using meshio
-    mesh = meshio.read(inp_file_path)
+    try:
+        mesh = read_inp_mesh(inp_file_path)
+    except UnsupportedElementError:
+        # Read the input file using meshio
+        meshio.read(inp_file_path).write(inp_file_path + extension)
+        return
 
     # Write the mesh to VTK format
-    mesh.write(inp_file_path + ".vtk")
-    # mesh.write(inp_file_path + ".stl")
+    mesh.save(inp_file_path + extension)
+    # mesh.save(inp_file_path + ".stl")
 
 
-def convert_all_inp_files_to_vtk() -> None:
+def convert_inp_files_to_vtk(
+    inp_file_paths: List[str], extension: str = VTK_EXTENSION
+) -> None:
     """
-    Converts all input files (.inp) in the dataset to VTK format.
+    Converts many input files (.inp) to the VTK format within the current process.
 
     Parameters:
-        None
+        inp_file_paths (List[str]): The paths of the input files.
+        extension (str, optional): The extension of the output files. Default is VTK_EXTENSION.
 
     Returns:
         None
 
     Example:
-        convert_all_inp_files_to_vtk()
+        convert_inp_files_to_vtk(['AORTA_PRE.inp', 'STENT_PRE.inp'])
     """
-    # Get the path to the patients directory
-    patients_path = os.path.join(DATA_DIR, PATIENTS_DIR)
+    for inp_file_path in inp_file_paths:
+        convert_inp_to_vtk(inp_file_path, extension)
 
-    # Get the list of patients
-    patients = os.listdir(patients_path)
 
-    # Iterate over the patients
-    for patient in tqdm.tqdm(patients):
-        # Get the path to the sizes directory for the current patient
-        sizes_path = os.path.join(patients_path, patient)
+def convert_case_to_vtk(
+    patient: str, size: str, incremental: bool = INCREMENTAL
+) -> None:
+    """
+    Converts the part input files (.inp) of a single case to VTK format.
 
-        # Get the list of sizes for the current patient
-        sizes = os.listdir(sizes_path)
+    Parameters:
+        patient (str): The patient directory name.
+        size (str): The size directory name of the patient.
+        incremental (bool, optional): Skip the case if its VTK files are up to date. Default is INCREMENTAL.
 
-        # Iterate over the sizes
-        for size in sizes:
-            # Get the path to the files directory for the current size
-            files_path = os.path.join(sizes_path, size)
+    Returns:
+        None
 
-            # Get the path of the input file (.inp) in the current size directory
-            input_file_path = get_file_with_extension(files_path, "AORTA.inp")
+    Example:
+        convert_case_to_vtk("PATIENT-1", "29MM")
+    """
+    # Get the paths of the part input files (.inp) in the current size directory
+    patients_path = os.path.join(DATA_DIR, PATIENTS_DIR)
+    input_paths = [
+        get_case_file(patients_path, patient, size, extension)
+        for extension in INP_EXTENSIONS
+    ]
+
+    # Skip the case if the VTK files were already converted from the same inputs
+    manifest_path = os.path.join(
+        DATA_DIR, MANIFESTS_DIR, "inp_to_vtk", f"{patient}_{size}.json"
+    )
+    output_paths = [input_path + VTK_EXTENSION for input_path in input_paths]
+    if incremental and is_up_to_date(
+        load_manifest(manifest_path), input_paths, output_paths
+    ):
+        return
+
+    # Convert the input files to VTK format
+    convert_inp_files_to_vtk(input_paths)
+
+    save_manifest(manifest_path, make_manifest_entry(input_paths, output_paths))
+
+
+def convert_all_inp_files_to_vtk(
+    num_workers: int = NUM_WORKERS, incremental: bool = INCREMENTAL
+) -> None:
+    """
+    Converts all input files (.inp) in the dataset to VTK format.
 
-            # Convert the input file to STL format
-            convert_inp_to_vtk(input_file_path)
+    Parameters:
+        num_workers (int, optional): The number of worker processes. Default is NUM_WORKERS.
+        incremental (bool, optional): Only convert cases whose VTK files are out of date. Default is INCREMENTAL.
+
+    Returns:
+        None
+
+    Example:
+        convert_all_inp_files_to_vtk()
+    """
+    # Get the path to the patients directory and refresh its case catalog
+    patients_path = os.path.join(DATA_DIR, PATIENTS_DIR)
+    refresh_case_catalog(
+        patients_path, os.path.join(DATA_DIR, MANIFESTS_DIR, CATALOG_FILE)
+    )
+
+    # Process every (patient, size) case over the worker pool
+    run_cases_in_parallel(
+        partial(convert_case_to_vtk, incremental=incremental),
+        get_catalog_cases(patients_path),
+        num_workers,
+        "inp_to_vtk",
+    )
 
 
 if __name__ == "__main__":
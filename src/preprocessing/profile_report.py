@@ -0,0 +1,47 @@
+import os
+import pandas as pd
+
+from utils import *
+
+# Run any stage with TAVI_PROFILE_DIR set to record its profile, e.g.
+#   TAVI_PROFILE_DIR=/tmp/tavi-profile python geometry_to_image.py
+PROFILE_DIR = os.environ.get(PROFILE_ENV, "/tmp/tavi-profile")
+NUM_CASES = 20
+
+
+def write_profile_report(profile_dir: str = PROFILE_DIR) -> None:
+    """
+    Writes the Chrome trace and the summary table of a profiled run, and prints
+    the time of every stage of the slowest cases.
+
+    Parameters:
+        profile_dir (str, optional): The profiling directory. Default is PROFILE_DIR.
+
+    Returns:
+        None
+
+    Example:
+        write_profile_report('/tmp/tavi-profile')
+    """
+    export_profile(profile_dir)
+
+    # Wall time of every stage of the slowest cases
+    events = [
+        event for event in load_profile_events(profile_dir) if event["args"].get("case")
+    ]
+    if events:
+        cases = pd.DataFrame(
+            {
+                "case": [event["args"]["case"] for event in events],
+                "stage": [event["name"] for event in events],
+                "wall_s": [event["dur"] / 1e6 for event in events],
+            }
+        ).pivot_table(index="case", columns="stage", values="wall_s", aggfunc="sum")
+        cases = cases.loc[cases.max(axis=1).sort_values(ascending=False).index]
+        print(
+            cases.head(NUM_CASES).to_string(float_format=lambda value: f"{value:.3f}")
+        )
+
+
+if __name__ == "__main__":
+    write_profile_report()
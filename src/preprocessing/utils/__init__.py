@@ -1,3 +1,52 @@
-from .abaqus_utils import *
-from .file_utils import *
-from .geometry_utils import *
+import importlib
+
+# The submodules are imported on first use, so that importing a single one of them,
+# e.g. utils.profiling_utils from the inference scripts, does not import pyvista.
+# Names defined in several submodules resolve to the last one, like star imports.
+_SUBMODULES = [
+    "abaqus_utils",
+    "file_utils",
+    "geometry_utils",
+    "parallel_utils",
+    "cache_utils",
+    "manifest_utils",
+    "curvature_utils",
+    "dataset_utils",
+    "split_utils",
+    "catalog_utils",
+    "profiling_utils",
+]
+
+_EXPORTS = None
+
+
+def _get_exports():
+    # Maps every public name of the submodules to the submodule defining it
+    global _EXPORTS
+    if _EXPORTS is None:
+        exports = {}
+        for submodule in _SUBMODULES:
+            module = importlib.import_module("." + submodule, __name__)
+            for name in dir(module):
+                if not name.startswith("_"):
+                    exports[name] = module
+        _EXPORTS = exports
+    return _EXPORTS
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    if name == "__all__":
+        return list(_get_exports())
+
+    exports = _get_exports()
+    if name not in exports:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(exports[name], name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_get_exports()))
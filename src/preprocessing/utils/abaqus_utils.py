@@ -1,38 +1,240 @@
+import os
+import json
+import mmap
+import struct
+import re
+import numpy as np
 import pandas as pd
-from io import StringIO
+from typing import Dict, List, Optional, Tuple
+from contextlib import ExitStack
+
+from .profiling_utils import profiled
+
+# Maps line breaks in data sections to value separators, carriage returns are deleted
+_NODE_TABLE = bytes.maketrans(b"\n", b",")
+# Runs of separators left by blank lines or trailing commas, which NumPy would
+# otherwise read as -1 when they only hold whitespace
+_EMPTY_RECORD = re.compile(rb",\s*,")
+_EMPTY_RECORDS = re.compile(rb"(?:\s*,)+")
+
+# Number of nodes and VTK cell type of the Abaqus element types read by `read_inp_elements`
+ELEMENT_TYPES = {
+    "B31": (2, 3),  # VTK_LINE
+    "T3D2": (2, 3),
+    "S3": (3, 5),  # VTK_TRIANGLE
+    "S3R": (3, 5),
+    "STRI3": (3, 5),
+    "M3D3": (3, 5),
+    "R3D3": (3, 5),
+    "S4": (4, 9),  # VTK_QUAD
+    "S4R": (4, 9),
+    "M3D4": (4, 9),
+    "M3D4R": (4, 9),
+    "R3D4": (4, 9),
+    "C3D4": (4, 10),  # VTK_TETRA
+    "C3D6": (6, 13),  # VTK_WEDGE
+    "C3D8": (8, 12),  # VTK_HEXAHEDRON
+    "C3D8R": (8, 12),
+    "C3D8I": (8, 12),
+}
+
+
+class UnsupportedElementError(NotImplementedError):
+    """
+    Raised when an input file has an element type missing from ELEMENT_TYPES.
+    """
 
 
-def _get_point_cloud_from_inp_file(inp_file_path: str) -> pd.DataFrame:
+# Result columns of the CONTACT and SPOS result files
+PRESSURE_COLUMN = "CPRESS     General_Contact_Domain"
+STRESS_COLUMN = "S-Mises"
+
+# Columnar result files start with this magic followed by a length-prefixed JSON header
+RESULT_COLUMNS_MAGIC = b"TAVICOL1"
+RESULT_COLUMNS_EXTENSION = ".cols"
+_RESULT_COLUMNS_ALIGNMENT = 64
+
+
+@profiled()
+def read_inp_nodes(inp_file_path: str) -> Tuple[np.ndarray, np.ndarray]:
     """
-    Reads an input file in 'inp' format and extracts the point cloud data.
+    Reads the '*Node' section of an input file in 'inp' format into NumPy arrays.
+
+    The section is located by byte offset on a memory map of the file and decoded
+    in a single vectorized call, without splitting it into Python strings.
 
     Parameters:
         inp_file_path (str): The file path of the input file.
 
     Returns:
-        pd.DataFrame: A DataFrame containing the extracted point cloud data with columns ['Node', 'X', 'Y', 'Z'].
+        Tuple[np.ndarray, np.ndarray]: The (N,) int64 node labels and the (N, 3) float64 coordinates.
+
+    Raises:
+        ValueError: If the file has no '*Node' section or the section is malformed.
+    """
+    # Empty files cannot be memory-mapped
+    if os.path.getsize(inp_file_path) == 0:
+        raise ValueError(f"No '*Node' section found in {inp_file_path}")
+
+    with open(inp_file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # Find the line starting the '*Node' section
+            if mm[:5] == b"*Node":
+                header = 0
+            else:
+                header = mm.find(b"\n*Node") + 1
+                if header == 0:
+                    raise ValueError(f"No '*Node' section found in {inp_file_path}")
+
+            # The node data starts after the header and ends at the next keyword line
+            start = mm.find(b"\n", header) + 1
+            if start == 0:
+                start = len(mm)
+            end = mm.find(b"\n*", start - 1)
+            if end == -1:
+                end = len(mm)
+
+            data = mm[start:end]
+
+    values = _parse_number_table(data, 4, inp_file_path)
+    labels = values[:, 0].astype(np.int64)
+    if np.any(labels < 1):
+        raise ValueError(f"Invalid node labels in {inp_file_path}")
+    points = np.ascontiguousarray(values[:, 1:])
+
+    return labels, points
+
+
+def _parse_number_table(
+    data: bytes, num_columns: int, inp_file_path: str
+) -> np.ndarray:
+    """
+    Decodes the comma separated lines of an 'inp' data section into a 2D array.
+
+    Parameters:
+        data (bytes): The raw bytes of the section, without its keyword line.
+        num_columns (int): The number of values of every row, rows may span several lines.
+        inp_file_path (str): The file path of the input file, used in error messages.
+
+    Returns:
+        np.ndarray: The (rows, num_columns) float64 array.
+
+    Raises:
+        ValueError: If the section is malformed.
     """
-    node_lines = []
-    with open(inp_file_path, "r") as f:
-        lines = f.readlines()
+    # Turn every line break into a separator so the section becomes a flat list of numbers
+    data = data.translate(_NODE_TABLE, b"\r")
+    # Remove the empty records before parsing, the search is cheaper than the substitution
+    if _EMPTY_RECORD.search(data):
+        data = _EMPTY_RECORDS.sub(b",", data)
+    data = data.strip(b", \t")
+
+    try:
+        values = np.fromstring(data, dtype=np.float64, sep=",") if data else np.empty(0)
+    except ValueError:
+        raise ValueError(f"Malformed data section in {inp_file_path}") from None
+
+    if values.size % num_columns != 0:
+        raise ValueError(f"Malformed data section in {inp_file_path}")
 
-        # Find the starting line of the '*Node' section
-        for i, line in enumerate(lines):
-            if line.startswith("*Node"):
-                node_start = i
-                break
+    return values.reshape(-1, num_columns)
 
-        # Find the ending line of the '*Node' section
-        for i, line in enumerate(lines[node_start + 1 :]):
-            if line.startswith("*"):
-                node_end = node_start + i
-                break
 
-        # Extract the lines containing node data
-        node_lines = lines[node_start + 1 : node_end + 1]
+def _find_element_keyword(mm: mmap.mmap, start: int) -> int:
+    """
+    Finds the next '*Element' keyword line, skipping keywords like '*Element Output'.
 
-    # Convert the extracted node data to a DataFrame
-    return pd.read_csv(StringIO("\n".join(node_lines)), names=["Node", "X", "Y", "Z"])
+    Parameters:
+        mm (mmap.mmap): The memory map of the input file.
+        start (int): The offset to search from.
+
+    Returns:
+        int: The offset of the keyword line, or -1 if there is none.
+    """
+    if start == 0 and mm[:8] == b"*Element":
+        header = 0
+    else:
+        found = mm.find(b"\n*Element", start)
+        header = found + 1 if found != -1 else -1
+
+    while header != -1:
+        if mm[header + 8 : header + 9] in (b",", b"\r", b"\n", b""):
+            return header
+        found = mm.find(b"\n*Element", header)
+        header = found + 1 if found != -1 else -1
+
+    return -1
+
+
+@profiled()
+def read_inp_elements(inp_file_path: str) -> List[Tuple[str, np.ndarray]]:
+    """
+    Reads every '*Element' section of an input file in 'inp' format into NumPy arrays.
+
+    Parameters:
+        inp_file_path (str): The file path of the input file.
+
+    Returns:
+        List[Tuple[str, np.ndarray]]: The element type and the (E, nodes) int64 node labels of every section.
+
+    Raises:
+        UnsupportedElementError: If a section has an element type missing from ELEMENT_TYPES.
+        ValueError: If a section is malformed.
+    """
+    sections = []
+    if os.path.getsize(inp_file_path) == 0:
+        return sections
+
+    with open(inp_file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header = _find_element_keyword(mm, 0)
+            while header != -1:
+                # Read the element type from the keyword line
+                start = mm.find(b"\n", header) + 1 or len(mm)
+                keyword = mm[header:start].decode(errors="ignore")
+                match = re.search(r"type\s*=\s*(\w+)", keyword, re.IGNORECASE)
+                element_type = match.group(1).upper() if match else ""
+                if element_type not in ELEMENT_TYPES:
+                    raise UnsupportedElementError(
+                        f"Element type '{element_type}' in {inp_file_path} is not supported"
+                    )
+
+                # The element data ends at the next keyword line
+                end = mm.find(b"\n*", start - 1)
+                if end == -1:
+                    end = len(mm)
+
+                table = _parse_number_table(
+                    mm[start:end], ELEMENT_TYPES[element_type][0] + 1, inp_file_path
+                )
+                connectivity = table[:, 1:].astype(np.int64)
+                if np.any(connectivity < 1):
+                    raise ValueError(
+                        f"Invalid node labels in the elements of {inp_file_path}"
+                    )
+                sections.append((element_type, connectivity))
+
+                # Move on to the next '*Element' section
+                header = _find_element_keyword(mm, end)
+
+    return sections
+
+
+def _get_point_cloud_from_inp_file(inp_file_path: str) -> pd.DataFrame:
+    """
+    Reads an input file in 'inp' format and extracts the point cloud data.
+
+    Parameters:
+        inp_file_path (str): The file path of the input file.
+
+    Returns:
+        pd.DataFrame: A DataFrame containing the extracted point cloud data with columns ['Node', 'X', 'Y', 'Z'].
+    """
+    labels, points = read_inp_nodes(inp_file_path)
+
+    return pd.DataFrame(
+        {"Node": labels, "X": points[:, 0], "Y": points[:, 1], "Z": points[:, 2]}
+    )
 
 
 def _get_clean_result(df: pd.DataFrame, column_name: str) -> pd.DataFrame:
@@ -53,6 +255,7 @@ def _get_clean_result(df: pd.DataFrame, column_name: str) -> pd.DataFrame:
     return df[["Node", "Value"]]
 
 
+@profiled()
 def get_pressure_result(inp_file_path: str, pressure_path: str) -> pd.DataFrame:
     """
     Reads an input file and a result file, and merges the extracted point cloud data with the result data.
@@ -71,7 +274,7 @@ def get_pressure_result(inp_file_path: str, pressure_path: str) -> pd.DataFrame:
     result = pd.read_csv(pressure_path, skipinitialspace=True)
 
     # Extract the nodes and pressure data from the result DataFrame
-    clean_result = _get_clean_result(result, "CPRESS     General_Contact_Domain")
+    clean_result = _get_clean_result(result, PRESSURE_COLUMN)
 
     # Merge the point cloud data with the result data based on the 'Node' column
     merged_data = points.merge(clean_result, on="Node", how="inner").fillna(0)
@@ -79,6 +282,7 @@ def get_pressure_result(inp_file_path: str, pressure_path: str) -> pd.DataFrame:
     return merged_data
 
 
+@profiled()
 def get_stress_result(inp_file_path: str, stress_path: str) -> pd.DataFrame:
     """
     Reads an input file and a result file, and merges the extracted point cloud data with the result data.
@@ -97,7 +301,7 @@ def get_stress_result(inp_file_path: str, stress_path: str) -> pd.DataFrame:
     result = pd.read_csv(stress_path, skipinitialspace=True)
 
     # Extract the nodes and pressure data from the result DataFrame
-    clean_result = _get_clean_result(result, "S-Mises")
+    clean_result = _get_clean_result(result, STRESS_COLUMN)
 
     # Merge the point cloud data with the result data based on the 'Node' column
     merged_data = points.merge(clean_result, on="Node", how="inner").fillna(0)
@@ -105,6 +309,189 @@ def get_stress_result(inp_file_path: str, stress_path: str) -> pd.DataFrame:
     return merged_data
 
 
+@profiled()
+def read_result(result_path: str, column_name: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Reads the node labels and values of a result file without merging them with the mesh.
+
+    Parameters:
+        result_path (str): The file path of the result file.
+        column_name (str): The result column, e.g. PRESSURE_COLUMN or STRESS_COLUMN.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The (M,) float64 node labels and the (M,) float64 values.
+        Entries that are not numeric are NaN.
+    """
+    result = pd.read_csv(result_path, skipinitialspace=True)
+    clean_result = _get_clean_result(result, column_name)
+
+    return (
+        clean_result["Node"].to_numpy(dtype=np.float64),
+        clean_result["Value"].to_numpy(dtype=np.float64),
+    )
+
+
+def write_result_columns(
+    result_path: str, column_name: str, columns_path: Optional[str] = None
+) -> str:
+    """
+    Converts a result file (.csv) to a typed, memory-mappable columnar file.
+
+    The file stores the node labels as int32 and the values as float32 columns,
+    each aligned to 64 bytes after a small JSON header. Rows without a numeric node
+    label are dropped, values that are not numeric are stored as NaN.
+
+    Parameters:
+        result_path (str): The file path of the result file.
+        column_name (str): The result column, e.g. PRESSURE_COLUMN or STRESS_COLUMN.
+        columns_path (str, optional): The output path. Default is result_path + RESULT_COLUMNS_EXTENSION.
+
+    Returns:
+        str: The path of the columnar file.
+
+    Example:
+        write_result_columns('SPOS.csv', STRESS_COLUMN)
+    """
+    if columns_path is None:
+        columns_path = result_path + RESULT_COLUMNS_EXTENSION
+
+    labels, values = read_result(result_path, column_name)
+    valid = ~np.isnan(labels)
+    columns = {
+        "Node": labels[valid].astype(np.int32),
+        "Value": values[valid].astype(np.float32),
+    }
+
+    # Lay the columns out after the header, each one aligned for zero-copy access
+    header = {"rows": int(valid.sum()), "source_column": column_name, "columns": {}}
+    offset = 0
+    for name, column in columns.items():
+        header["columns"][name] = {"dtype": column.dtype.str, "offset": offset}
+        offset += (
+            -(-column.nbytes // _RESULT_COLUMNS_ALIGNMENT) * _RESULT_COLUMNS_ALIGNMENT
+        )
+
+    header_bytes = json.dumps(header).encode()
+    data_start = len(RESULT_COLUMNS_MAGIC) + 4 + len(header_bytes)
+    data_start = -(-data_start // _RESULT_COLUMNS_ALIGNMENT) * _RESULT_COLUMNS_ALIGNMENT
+
+    temp_path = f"{columns_path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(RESULT_COLUMNS_MAGIC)
+        file.write(struct.pack("<I", len(header_bytes)))
+        file.write(header_bytes)
+        for name, column in columns.items():
+            file.seek(data_start + header["columns"][name]["offset"])
+            file.write(column.tobytes())
+    os.replace(temp_path, columns_path)
+
+    return columns_path
+
+
+def read_result_column(columns_path: str, name: str) -> np.ndarray:
+    """
+    Reads a single column of a columnar result file as a read-only memory map.
+
+    Parameters:
+        columns_path (str): The path of the file written by `write_result_columns`.
+        name (str): The column to read, 'Node' or 'Value'.
+
+    Returns:
+        np.ndarray: The (M,) column, int32 node labels or float32 values.
+
+    Raises:
+        ValueError: If the file is not a columnar result file.
+        KeyError: If the file has no such column.
+
+    Example:
+        values = read_result_column('SPOS.csv.cols', 'Value')
+    """
+    with open(columns_path, "rb") as file:
+        if file.read(len(RESULT_COLUMNS_MAGIC)) != RESULT_COLUMNS_MAGIC:
+            raise ValueError(f"{columns_path} is not a columnar result file")
+        (header_size,) = struct.unpack("<I", file.read(4))
+        header = json.loads(file.read(header_size))
+
+    data_start = len(RESULT_COLUMNS_MAGIC) + 4 + header_size
+    data_start = -(-data_start // _RESULT_COLUMNS_ALIGNMENT) * _RESULT_COLUMNS_ALIGNMENT
+
+    column = header["columns"][name]
+    if header["rows"] == 0:
+        return np.empty(0, dtype=column["dtype"])
+
+    return np.memmap(
+        columns_path,
+        dtype=column["dtype"],
+        mode="r",
+        offset=data_start + column["offset"],
+        shape=(header["rows"],),
+    )
+
+
+def get_node_index(labels: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Builds a lookup from node labels to point indices.
+
+    Parameters:
+        labels (np.ndarray): The (N,) node label of every mesh point, in point order.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The sorted labels and the point index of every sorted label.
+
+    Example:
+        labels, _ = read_inp_nodes('AORTA.inp')
+        node_index = get_node_index(labels)
+    """
+    order = np.argsort(labels, kind="stable")
+    return labels[order], order
+
+
+def map_nodal_values(
+    node_index: Tuple[np.ndarray, np.ndarray],
+    result_labels: np.ndarray,
+    values: np.ndarray,
+    fill_value: float = 0.0,
+) -> np.ndarray:
+    """
+    Scatters nodal result values onto the mesh points in a single vectorized step.
+
+    Points without a result, and results that are NaN, get the fill value. Results
+    for labels that are not part of the mesh are ignored.
+
+    Parameters:
+        node_index (Tuple[np.ndarray, np.ndarray]): The lookup returned by `get_node_index`.
+        result_labels (np.ndarray): The (M,) node labels of the results.
+        values (np.ndarray): The (M,) result values.
+        fill_value (float, optional): The value of points without a result. Default is 0.0.
+
+    Returns:
+        np.ndarray: The (N,) float64 value of every mesh point, in point order.
+
+    Example:
+        point_data = map_nodal_values(node_index, *read_result('SPOS.csv', STRESS_COLUMN))
+    """
+    sorted_labels, order = node_index
+    point_values = np.full(len(sorted_labels), fill_value, dtype=np.float64)
+    if len(sorted_labels) == 0:
+        return point_values
+
+    result_labels = np.asarray(result_labels)
+    values = np.asarray(values, dtype=np.float64)
+
+    # Locate every result label among the mesh labels
+    valid = ~np.isnan(result_labels.astype(np.float64))
+    result_labels, values = result_labels[valid], values[valid]
+    positions = np.searchsorted(sorted_labels, result_labels)
+    positions = np.minimum(positions, len(sorted_labels) - 1)
+    found = sorted_labels[positions] == result_labels
+
+    point_values[order[positions[found]]] = np.where(
+        np.isnan(values[found]), fill_value, values[found]
+    )
+
+    return point_values
+
+
 def extract_part(data, part_name):
     """
     Extracts a part from a string containing Abaqus input file data.
@@ -129,3 +516,66 @@ def extract_part(data, part_name):
         if in_part:
             part_data.append(line)
     return "\n".join(part_data)
+
+
+@profiled()
+def extract_parts_from_inp_file(inp_file_path: str, part_paths: Dict[str, str]) -> None:
+    """
+    Extracts several parts from an Abaqus input file in a single streaming pass.
+
+    The input file is read line by line and every requested part is written to its
+    output file as soon as it is encountered, so memory usage does not depend on the
+    size of the input file. The output of each part is identical to `extract_part`.
+
+    Parameters:
+        inp_file_path (str): The file path of the input file in 'inp' format.
+        part_paths (Dict[str, str]): A mapping from part name to the output file path.
+
+    Returns:
+        None
+
+    Example:
+        extract_parts_from_inp_file(
+            "case.inp", {"AORTA": "case.inpAORTA_PRE.inp", "STENT": "case.inpSTENT_PRE.inp"}
+        )
+    """
+    start_lines = {name: f"*Part, name={name}" for name in part_paths}
+    end_line = "*End Part"
+
+    with ExitStack() as stack:
+        # Open every output upfront so that missing parts still produce an (empty) file
+        output_files = {
+            name: stack.enter_context(open(path, "w"))
+            for name, path in part_paths.items()
+        }
+        pending = set(part_paths)
+        current_part = None
+        first_line = True
+
+        with open(inp_file_path, "r") as file:
+            for line in file:
+                line = line.rstrip("\n")
+
+                if current_part is None:
+                    # Look for the beginning of a part that has not been extracted yet
+                    for name in pending:
+                        if line.startswith(start_lines[name]):
+                            current_part = name
+                            first_line = True
+                            break
+                    else:
+                        continue
+
+                elif line == end_line:
+                    # Part is complete, stop early once every part has been written
+                    pending.discard(current_part)
+                    current_part = None
+                    if not pending:
+                        break
+                    continue
+
+                # Lines are joined with newlines, matching `extract_part`
+                if not first_line:
+                    output_files[current_part].write("\n")
+                output_files[current_part].write(line)
+                first_line = False
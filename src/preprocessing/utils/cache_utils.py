@@ -0,0 +1,277 @@
+import os
+import shutil
+import hashlib
+import numpy as np
+import pyvista as pv
+from typing import Callable, Dict, List, Optional
+
+from .profiling_utils import profile_stage, profiled
+
+# Default upper bound for the total size of a cache directory (in bytes)
+CACHE_MAX_BYTES = 20 * 1024**3
+
+# Number of bytes hashed from the beginning and the end of every input file
+_FINGERPRINT_CHUNK = 1024**2
+
+
+def file_fingerprint(path: str) -> str:
+    """
+    Computes a cheap content fingerprint of a file.
+
+    The fingerprint combines the absolute path, size and modification time of the
+    file with a hash of its first and last megabyte, so that it changes whenever
+    the file is rewritten without reading multi-hundred-MB decks completely.
+
+    Parameters:
+        path (str): The path of the file.
+
+    Returns:
+        str: The hexadecimal fingerprint of the file.
+
+    Example:
+        fingerprint = file_fingerprint('/path/to/AORTA.inp')
+    """
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+
+    with open(path, "rb") as file:
+        digest.update(file.read(_FINGERPRINT_CHUNK))
+        if stat.st_size > 2 * _FINGERPRINT_CHUNK:
+            file.seek(-_FINGERPRINT_CHUNK, os.SEEK_END)
+            digest.update(file.read(_FINGERPRINT_CHUNK))
+
+    return digest.hexdigest()
+
+
+def get_cache_key(tag: str, input_paths: List[str]) -> str:
+    """
+    Builds the cache key of an entry from its tag and the fingerprints of its inputs.
+
+    Parameters:
+        tag (str): The kind of the cached entry, e.g. 'mesh' or 'stress'.
+        input_paths (List[str]): The files the entry is computed from.
+
+    Returns:
+        str: The hexadecimal cache key.
+    """
+    digest = hashlib.blake2b(tag.encode(), digest_size=16)
+    for path in input_paths:
+        digest.update(file_fingerprint(path).encode())
+    return digest.hexdigest()
+
+
+@profiled("cache_load")
+def load_cached_arrays(cache_dir: str, key: str) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Loads the arrays of a cache entry as read-only memory maps.
+
+    Parameters:
+        cache_dir (str): The root directory of the cache.
+        key (str): The cache key of the entry.
+
+    Returns:
+        Optional[Dict[str, np.ndarray]]: The cached arrays, or None if the entry does not exist.
+    """
+    entry_dir = os.path.join(cache_dir, key)
+    if not os.path.isdir(entry_dir):
+        return None
+
+    try:
+        arrays = {
+            file[:-4]: np.load(os.path.join(entry_dir, file), mmap_mode="r")
+            for file in os.listdir(entry_dir)
+            if file.endswith(".npy")
+        }
+        # Mark the entry as recently used for the eviction policy
+        os.utime(entry_dir)
+    except (OSError, ValueError):
+        # The entry was evicted or is being replaced by another worker
+        return None
+
+    return arrays
+
+
+@profiled("cache_save")
+def save_cached_arrays(
+    cache_dir: str,
+    key: str,
+    arrays: Dict[str, np.ndarray],
+    max_bytes: int = CACHE_MAX_BYTES,
+) -> None:
+    """
+    Stores arrays as a cache entry and evicts the least recently used entries.
+
+    The entry is written to a temporary directory and renamed into place, so
+    concurrent workers never observe partially written entries.
+
+    Parameters:
+        cache_dir (str): The root directory of the cache.
+        key (str): The cache key of the entry.
+        arrays (Dict[str, np.ndarray]): The arrays to store, by name.
+        max_bytes (int, optional): The maximum total size of the cache. Default is CACHE_MAX_BYTES.
+
+    Returns:
+        None
+    """
+    entry_dir = os.path.join(cache_dir, key)
+    temp_dir = f"{entry_dir}.{os.getpid()}.tmp"
+    os.makedirs(temp_dir, exist_ok=True)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(temp_dir, name + ".npy"), np.ascontiguousarray(array))
+
+    try:
+        os.rename(temp_dir, entry_dir)
+    except OSError:
+        # Another worker stored the same entry first
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    evict_cache(cache_dir, max_bytes)
+
+
+def evict_cache(cache_dir: str, max_bytes: int = CACHE_MAX_BYTES) -> None:
+    """
+    Removes the least recently used cache entries until the cache fits in max_bytes.
+
+    Parameters:
+        cache_dir (str): The root directory of the cache.
+        max_bytes (int, optional): The maximum total size of the cache. Default is CACHE_MAX_BYTES.
+
+    Returns:
+        None
+    """
+    entries = []
+    total_bytes = 0
+    for entry in os.scandir(cache_dir):
+        if not entry.is_dir() or entry.name.endswith(".tmp"):
+            continue
+        try:
+            size = sum(file.stat().st_size for file in os.scandir(entry.path))
+            entries.append((entry.stat().st_mtime, size, entry.path))
+        except OSError:
+            continue
+        total_bytes += size
+
+    # Oldest entries are evicted first
+    for _, size, path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total_bytes -= size
+
+
+def cached_arrays(
+    cache_dir: Optional[str],
+    tag: str,
+    input_paths: List[str],
+    compute: Callable[[], Dict[str, np.ndarray]],
+    max_bytes: int = CACHE_MAX_BYTES,
+) -> Dict[str, np.ndarray]:
+    """
+    Returns the cached arrays computed from the input files, computing them on a miss.
+
+    Parameters:
+        cache_dir (Optional[str]): The root directory of the cache. None disables caching.
+        tag (str): The kind of the cached entry, e.g. 'mesh' or 'stress'.
+        input_paths (List[str]): The files the arrays are computed from.
+        compute (Callable[[], Dict[str, np.ndarray]]): Computes the arrays on a cache miss.
+        max_bytes (int, optional): The maximum total size of the cache. Default is CACHE_MAX_BYTES.
+
+    Returns:
+        Dict[str, np.ndarray]: The arrays, by name.
+
+    Example:
+        arrays = cached_arrays(cache_dir, "nodes", [inp_file], lambda: {"labels": ...})
+    """
+    if cache_dir is None:
+        return compute()
+
+    key = get_cache_key(tag, input_paths)
+    arrays = load_cached_arrays(cache_dir, key)
+    if arrays is None:
+        arrays = compute()
+        save_cached_arrays(cache_dir, key, arrays, max_bytes)
+
+    return arrays
+
+
+def _mesh_to_arrays(mesh: pv.DataSet) -> Dict[str, np.ndarray]:
+    """
+    Flattens a mesh into the arrays needed to rebuild it.
+
+    Parameters:
+        mesh (pv.DataSet): A PolyData or UnstructuredGrid mesh.
+
+    Returns:
+        Dict[str, np.ndarray]: The points, connectivity and point data of the mesh.
+    """
+    arrays = {"points": np.asarray(mesh.points)}
+    if isinstance(mesh, pv.PolyData):
+        arrays["faces"] = np.asarray(mesh.faces)
+    else:
+        mesh = mesh.cast_to_unstructured_grid()
+        arrays["cells"] = np.asarray(mesh.cells)
+        arrays["celltypes"] = np.asarray(mesh.celltypes)
+
+    for name in mesh.point_data.keys():
+        arrays["point_data." + name] = np.asarray(mesh.point_data[name])
+
+    return arrays
+
+
+def _arrays_to_mesh(arrays: Dict[str, np.ndarray]) -> pv.DataSet:
+    """
+    Rebuilds a mesh from the arrays produced by `_mesh_to_arrays`.
+
+    Parameters:
+        arrays (Dict[str, np.ndarray]): The points, connectivity and point data of the mesh.
+
+    Returns:
+        pv.DataSet: The PolyData or UnstructuredGrid mesh.
+    """
+    points = np.array(arrays["points"])
+    if "faces" in arrays:
+        mesh = pv.PolyData(points, np.array(arrays["faces"]))
+    else:
+        mesh = pv.UnstructuredGrid(
+            np.array(arrays["cells"]), np.array(arrays["celltypes"]), points
+        )
+
+    for name, array in arrays.items():
+        if name.startswith("point_data."):
+            mesh.point_data[name[len("point_data.") :]] = np.array(array)
+
+    return mesh
+
+
+@profiled()
+def read_mesh(
+    path: str, cache_dir: Optional[str] = None, max_bytes: int = CACHE_MAX_BYTES
+) -> pv.DataSet:
+    """
+    Reads a mesh with pyvista, reusing the parsed arrays from the cache if available.
+
+    Parameters:
+        path (str): The path of the mesh file, e.g. 'AORTA_PRE.inp.vtk'.
+        cache_dir (Optional[str], optional): The root directory of the cache. None disables caching. Default is None.
+        max_bytes (int, optional): The maximum total size of the cache. Default is CACHE_MAX_BYTES.
+
+    Returns:
+        pv.DataSet: The mesh.
+
+    Example:
+        aorta = read_mesh('/path/to/AORTA_PRE.inp.vtk', '/path/to/Cache')
+    """
+
+    def read():
+        with profile_stage("pv.read", path=path):
+            return pv.read(path)
+
+    if cache_dir is None:
+        return read()
+
+    arrays = cached_arrays(
+        cache_dir, "mesh", [path], lambda: _mesh_to_arrays(read()), max_bytes
+    )
+    return _arrays_to_mesh(arrays)
@@ -0,0 +1,203 @@
+import os
+import json
+import warnings
+from typing import Dict, List, Optional, Tuple
+
+from .file_utils import get_file_with_extension
+from .manifest_utils import load_manifest, save_manifest
+from .profiling_utils import profiled
+
+# Case catalogs loaded in this process, by patients directory
+_CASE_CATALOGS = {}
+# Records the catalog file of every refreshed patients directory for spawned workers
+CATALOG_ENV = "TAVI_CASE_CATALOGS"
+
+
+def _scan_dir(path: str) -> Tuple[List[os.DirEntry], List[os.DirEntry]]:
+    """
+    Lists the subdirectories and files of a directory in a single pass.
+    """
+    dirs, files = [], []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            (dirs if entry.is_dir() else files).append(entry)
+    return dirs, files
+
+
+@profiled()
+def scan_cases(patients_path: str, previous: Optional[Dict] = None) -> Dict:
+    """
+    Walks the patients directory once and lists the files of every (patient, size) case.
+
+    Directories whose modification time did not change since the previous catalog
+    are not listed again, so refreshing a catalog only costs one stat per directory.
+
+    Parameters:
+        patients_path (str): The path to the directory containing one folder per patient.
+        previous (Optional[Dict], optional): A previous catalog of the same directory. Default is None.
+
+    Returns:
+        Dict: The catalog, mapping every patient to its sizes and every size to its files.
+
+    Example:
+        catalog = scan_cases('/path/to/Patients')
+    """
+    previous_patients = (previous or {}).get("patients", {})
+
+    patients = {}
+    for patient_entry in _scan_dir(patients_path)[0]:
+        patient_mtime = patient_entry.stat().st_mtime_ns
+        previous_patient = previous_patients.get(patient_entry.name, {})
+
+        # A new or removed size changes the modification time of the patient
+        if previous_patient.get("mtime_ns") == patient_mtime:
+            size_entries = [
+                (size, os.path.join(patient_entry.path, size))
+                for size in previous_patient["sizes"]
+            ]
+        else:
+            size_entries = [
+                (entry.name, entry.path) for entry in _scan_dir(patient_entry.path)[0]
+            ]
+
+        sizes = {}
+        for size, size_path in size_entries:
+            size_mtime = os.stat(size_path).st_mtime_ns
+            previous_size = previous_patient.get("sizes", {}).get(size, {})
+            if previous_size.get("mtime_ns") == size_mtime:
+                sizes[size] = previous_size
+            else:
+                sizes[size] = {
+                    "mtime_ns": size_mtime,
+                    "files": [entry.name for entry in _scan_dir(size_path)[1]],
+                }
+
+        patients[patient_entry.name] = {"mtime_ns": patient_mtime, "sizes": sizes}
+
+    return {"patients_path": os.path.abspath(patients_path), "patients": patients}
+
+
+def refresh_case_catalog(patients_path: str, catalog_path: str) -> Dict:
+    """
+    Updates the cached case catalog of a patients directory and loads it in this process.
+
+    Call it once at the start of a stage, worker processes forked afterwards
+    inherit the loaded catalog and spawned ones load it from catalog_path.
+
+    Parameters:
+        patients_path (str): The path to the directory containing one folder per patient.
+        catalog_path (str): The path of the cached catalog (.json) file.
+
+    Returns:
+        Dict: The catalog.
+
+    Example:
+        refresh_case_catalog(patients_path, os.path.join(DATA_DIR, "Manifests", "catalog.json"))
+    """
+    previous = load_manifest(catalog_path)
+    if previous.get("patients_path") != os.path.abspath(patients_path):
+        previous = None
+
+    catalog = scan_cases(patients_path, previous)
+    if catalog != previous:
+        save_manifest(catalog_path, catalog)
+
+    _CASE_CATALOGS[os.path.abspath(patients_path)] = catalog
+
+    # Spawned workers do not inherit the loaded catalogs, only the environment
+    catalog_paths = json.loads(os.environ.get(CATALOG_ENV, "{}"))
+    catalog_paths[os.path.abspath(patients_path)] = os.path.abspath(catalog_path)
+    os.environ[CATALOG_ENV] = json.dumps(catalog_paths)
+
+    return catalog
+
+
+def _get_case_catalog(patients_path: str) -> Optional[Dict]:
+    """
+    Returns the catalog of a patients directory, loading it from its file in processes
+    that did not refresh it, e.g. spawned workers.
+    """
+    patients_path = os.path.abspath(patients_path)
+    catalog = _CASE_CATALOGS.get(patients_path)
+    if catalog is None:
+        catalog_path = json.loads(os.environ.get(CATALOG_ENV, "{}")).get(patients_path)
+        if catalog_path is not None:
+            catalog = load_manifest(catalog_path)
+            if catalog.get("patients_path") == patients_path:
+                _CASE_CATALOGS[patients_path] = catalog
+            else:
+                catalog = None
+    return catalog
+
+
+def get_catalog_cases(
+    patients_path: str, patients: Optional[List[str]] = None
+) -> List[Tuple[str, str]]:
+    """
+    Lists the (patient, size) cases of a patients directory from its loaded catalog.
+
+    Parameters:
+        patients_path (str): The path to the directory containing one folder per patient.
+        patients (List[str], optional): Restrict the cases to these patients. Default is all patients.
+
+    Returns:
+        List[Tuple[str, str]]: The list of (patient, size) cases. Patients missing from
+        the catalog, e.g. files next to the patient directories, are skipped with a warning.
+
+    Raises:
+        RuntimeError: If the catalog of the directory was never refreshed.
+    """
+    catalog = _get_case_catalog(patients_path)
+    if catalog is None:
+        raise RuntimeError(
+            f"No case catalog loaded for {patients_path}, call refresh_case_catalog first"
+        )
+
+    if patients is None:
+        patients = list(catalog["patients"])
+
+    missing = [patient for patient in patients if patient not in catalog["patients"]]
+    if missing:
+        warnings.warn(
+            f"Skipping patients missing from the case catalog of {patients_path}: "
+            + ", ".join(sorted(missing))
+        )
+
+    return [
+        (patient, size)
+        for patient in patients
+        if patient in catalog["patients"]
+        for size in catalog["patients"][patient]["sizes"]
+    ]
+
+
+def get_case_file(patients_path: str, patient: str, size: str, extension: str) -> str:
+    """
+    Resolves the first file of a case that matches an extension, like `get_file_with_extension`.
+
+    The file is looked up in the loaded catalog, falling back to listing the case
+    directory when no catalog is loaded or the catalog has no matching file yet.
+
+    Parameters:
+        patients_path (str): The path to the directory containing one folder per patient.
+        patient (str): The patient directory name.
+        size (str): The size directory name of the patient.
+        extension (str): The role of the file as its suffix, e.g. 'SPOS.csv'.
+
+    Returns:
+        str: The path of the file.
+
+    Example:
+        stress_file = get_case_file(patients_path, "PATIENT-1", "29MM", "SPOS.csv")
+    """
+    files_path = os.path.join(patients_path, patient, size)
+
+    catalog = _get_case_catalog(patients_path)
+    if catalog is not None:
+        case = catalog["patients"].get(patient, {}).get("sizes", {}).get(size)
+        if case is not None:
+            for file in case["files"]:
+                if file.endswith(extension):
+                    return os.path.join(files_path, file)
+
+    return get_file_with_extension(files_path, extension)
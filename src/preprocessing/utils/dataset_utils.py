@@ -0,0 +1,231 @@
+import os
+import cv2
+import json
+import time
+import numpy as np
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+from .parallel_utils import run_cases_in_parallel
+
+
+def _get_shard_name(split: str, generation: str, shard: int) -> str:
+    return f"{split}-{generation}-{shard:05d}.npy"
+
+
+def _write_shard_cases(
+    shard_path: str, records: Tuple[Dict], fields: List[str]
+) -> None:
+    # Every view is decoded straight into its slot of the shard
+    shard = np.load(shard_path, mmap_mode="r+")
+    for row, record in enumerate(records):
+        for field_index, field in enumerate(fields):
+            for view_index, image_path in enumerate(record["images"][field]):
+                image = cv2.imread(image_path, cv2.IMREAD_COLOR)
+                if image is None:
+                    raise ValueError(f"Cannot read {image_path}")
+                if image.shape != shard.shape[3:]:
+                    raise ValueError(
+                        f"{image_path} has shape {image.shape}, "
+                        f"expected {shard.shape[3:]}"
+                    )
+                cv2.cvtColor(
+                    image, cv2.COLOR_BGR2RGB, dst=shard[row, field_index, view_index]
+                )
+    shard.flush()
+
+
+def write_sharded_dataset(
+    dataset_dir: str,
+    split: str,
+    records: List[Dict],
+    fields: List[str],
+    cases_per_shard: int = 64,
+    num_workers: int = 1,
+) -> Dict:
+    """
+    Packs the views of every case into memory-mappable shards with an index.
+
+    Every shard is a (cases, fields, views, H, W, 3) uint8 RGB array, so a case
+    or a single view is a contiguous slice that can be read without touching the
+    other records. The index lists the shards and, for every case, its shard,
+    row, label and metadata.
+
+    Every build writes a new generation of shards next to the previous one and
+    only replaces the index once all of them are written, so a failed build
+    keeps the previous dataset and readers never see partially written shards.
+    The shards of the previous generation are deleted afterwards.
+
+    Parameters:
+        dataset_dir (str): The directory of the dataset.
+        split (str): The name of the split, used as the prefix of its shards.
+        records (List[Dict]): One dict per case with the 'case' name, an integer
+            'label', 'metadata' and the 'images' paths of every field, in view order.
+        fields (List[str]): The fields stored in every record, in shard order.
+        cases_per_shard (int, optional): The number of cases per shard. Default is 64.
+        num_workers (int, optional): The number of worker processes. Default is 1.
+
+    Returns:
+        Dict: The index of the split, also written to '<split>.json'.
+
+    Example:
+        write_sharded_dataset(dataset_dir, "Train", records, ["Raw", "Stress"])
+    """
+    os.makedirs(dataset_dir, exist_ok=True)
+
+    num_views = len(records[0]["images"][fields[0]]) if records else 0
+    image_shape = ()
+    if records:
+        first_image = cv2.imread(records[0]["images"][fields[0]][0], cv2.IMREAD_COLOR)
+        if first_image is None:
+            raise ValueError(f"Cannot read {records[0]['images'][fields[0]][0]}")
+        image_shape = first_image.shape
+
+    for record in records:
+        for field in fields:
+            if len(record["images"][field]) != num_views:
+                raise ValueError(
+                    f"{record['case']} has {len(record['images'][field])} "
+                    f"{field} views, expected {num_views}"
+                )
+
+    index_path = os.path.join(dataset_dir, split + ".json")
+    try:
+        with open(index_path, "r") as file:
+            previous_shards = [shard["path"] for shard in json.load(file)["shards"]]
+    except (OSError, ValueError, KeyError):
+        previous_shards = []
+
+    # Allocate every shard of the new generation before the workers fill them
+    generation = f"{time.time_ns():x}"
+    shards, cases, tasks = [], [], []
+    for shard, start in enumerate(range(0, len(records), cases_per_shard)):
+        shard_records = tuple(records[start : start + cases_per_shard])
+        shard_name = _get_shard_name(split, generation, shard)
+        shard_path = os.path.join(dataset_dir, shard_name)
+        np.lib.format.open_memmap(
+            shard_path,
+            mode="w+",
+            dtype=np.uint8,
+            shape=(len(shard_records), len(fields), num_views) + image_shape,
+        ).flush()
+
+        shards.append({"path": shard_name, "num_cases": len(shard_records)})
+        for row, record in enumerate(shard_records):
+            cases.append(
+                {
+                    "case": record["case"],
+                    "label": int(record.get("label", -1)),
+                    "metadata": record.get("metadata", {}),
+                    "shard": shard,
+                    "row": row,
+                }
+            )
+        tasks.append((shard_path, shard_records))
+
+    failures = run_cases_in_parallel(
+        partial(_write_shard_cases, fields=fields),
+        tasks,
+        num_workers,
+        f"dataset ({split})",
+    )
+    if failures:
+        # Keep the previous generation, which the index still points to
+        for shard in shards:
+            os.remove(os.path.join(dataset_dir, shard["path"]))
+        raise RuntimeError(f"{len(failures)} shards of {split} could not be written")
+
+    index = {
+        "split": split,
+        "fields": list(fields),
+        "num_views": num_views,
+        "image_shape": list(image_shape),
+        "shards": shards,
+        "cases": cases,
+    }
+    temp_path = f"{index_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(index, file, indent=1)
+    os.replace(temp_path, index_path)
+
+    # Readers that mapped the previous shards keep them until they close them
+    for shard_name in set(previous_shards) - {shard["path"] for shard in shards}:
+        try:
+            os.remove(os.path.join(dataset_dir, shard_name))
+        except OSError:
+            pass
+
+    return index
+
+
+class ShardedDataset:
+    """
+    Random access reader of a split written by `write_sharded_dataset`.
+
+    Shards are memory-mapped on first use, so reading a case or a view only
+    touches the pages of that record.
+
+    Parameters:
+        dataset_dir (str): The directory of the dataset.
+        split (str): The name of the split.
+
+    Example:
+        dataset = ShardedDataset('/path/to/Dataset', 'Train')
+        views = dataset.get_case(0, 'Stress')  # (12, H, W, 3)
+    """
+
+    def __init__(self, dataset_dir: str, split: str):
+        self.dataset_dir = dataset_dir
+        with open(os.path.join(dataset_dir, split + ".json"), "r") as file:
+            self.index = json.load(file)
+
+        self.fields = self.index["fields"]
+        self.cases = [case["case"] for case in self.index["cases"]]
+        self.labels = np.array(
+            [case["label"] for case in self.index["cases"]], dtype=np.int64
+        )
+        self._case_indices = {case: i for i, case in enumerate(self.cases)}
+        self._shards = [None] * len(self.index["shards"])
+
+    def __len__(self) -> int:
+        return len(self.cases)
+
+    def _get_shard(self, shard: int) -> np.ndarray:
+        if self._shards[shard] is None:
+            shard_path = os.path.join(
+                self.dataset_dir, self.index["shards"][shard]["path"]
+            )
+            self._shards[shard] = np.load(shard_path, mmap_mode="r")
+        return self._shards[shard]
+
+    def get_case_index(self, case: str) -> int:
+        return self._case_indices[case]
+
+    def get_metadata(self, index: int) -> Dict:
+        return self.index["cases"][index]["metadata"]
+
+    def get_case(self, index: int, field: Optional[str] = None) -> np.ndarray:
+        """
+        Returns the views of a case, for all fields or a single one.
+
+        Parameters:
+            index (int): The position of the case in the split.
+            field (Optional[str], optional): The field to read. Default is all fields.
+
+        Returns:
+            np.ndarray: The read-only (fields, views, H, W, 3) or (views, H, W, 3) views.
+        """
+        case = self.index["cases"][index]
+        record = self._get_shard(case["shard"])[case["row"]]
+        if field is None:
+            return record
+        return record[self.fields.index(field)]
+
+    def get_view(self, index: int, field: str, view: int) -> np.ndarray:
+        """
+        Returns a single (H, W, 3) view of a case.
+        """
+        return self.get_case(index, field)[view]
+
+    def __getitem__(self, index: int) -> Tuple[np.ndarray, int]:
+        return self.get_case(index), int(self.labels[index])
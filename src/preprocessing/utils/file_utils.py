@@ -1,4 +1,5 @@
 import os, shutil
+from typing import List, Optional, Tuple
 
 def get_file_with_extension(path: str, extension: str) -> str:
     """
@@ -34,6 +35,33 @@ def get_file_with_extension(path: str, extension: str) -> str:
         # Raise an exception if no matching files were found
         raise IndexError("No file with the specified extension was found in the directory.")
 
+def get_cases(
+    patients_path: str, patients: Optional[List[str]] = None
+) -> List[Tuple[str, str]]:
+    """
+    Lists the (patient, size) cases found under the patients directory.
+
+    Parameters:
+        patients_path (str): The path to the directory containing one folder per patient.
+        patients (List[str], optional): Restrict the cases to these patients. Default is all patients.
+
+    Returns:
+        List[Tuple[str, str]]: The list of (patient, size) cases.
+
+    Example:
+        cases = get_cases('/path/to/Patients', ['PATIENT-1', 'PATIENT-2'])
+    """
+    if patients is None:
+        patients = os.listdir(patients_path)
+
+    cases = []
+    for patient in patients:
+        for size in os.listdir(os.path.join(patients_path, patient)):
+            cases.append((patient, size))
+
+    return cases
+
+
 def clean_dir(path: str):
     try:
         shutil.rmtree(path=path)
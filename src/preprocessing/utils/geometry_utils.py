@@ -1,40 +1,105 @@
+import os
+import hashlib
+import matplotlib
 import numpy as np
 import pyvista as pv
 from PIL import Image
-from typing import List, Literal
-from matplotlib.pyplot import cm
+from typing import Dict, List, Literal, Optional, Tuple
 from pyvista.core.pointset import PolyData
-from matplotlib.colors import ListedColormap
+from matplotlib.colors import Colormap, ListedColormap
 
+from .profiling_utils import profile_stage, profiled
 
-def generate_rotating_snapshots(
-    geometry: PolyData,
+try:
+    from scipy.spatial import ConvexHull
+except ImportError:  # Views are framed from every point instead
+    ConvexHull = None
+
+
+def get_snapshot_paths(
     save_path: str,
-    clim: List[float] = [0.0, 0.4],
     rotation_axis: Literal["x", "y", "z"] = "z",
     rotation_step: int = 30,
-    ambient: float = 0.3,
-) -> None:
+) -> List[str]:
     """
-    Generates a series of rotating snapshots of a 3D geometry and saves them as images.
+    Returns the paths of the images written by `generate_rotating_snapshots`.
 
     Parameters:
-    - geometry (PolyData): The 3D geometry to be visualized and rotated.
-    - save_path (str): The path where the generated snapshots will be saved.
-    - clim (List[float], optional): The color range for mapping scalar values to colors. Default is [0.0, 0.4].
-    - rotation_axis (Literal["x", "y", "z"], optional): The axis around which the rotation will occur. Default is "z".
-    - rotation_step (int, optional): The angle (in degrees) by which the geometry will be rotated at each step. Default is 30.
-    - ambient (float, optional): The ambient lighting coefficient. Default is 0.3.
+    - save_path (str): The path prefix passed to `generate_rotating_snapshots`.
+    - rotation_axis (Literal["x", "y", "z"], optional): The rotation axis. Default is "z".
+    - rotation_step (int, optional): The rotation step in degrees. Default is 30.
 
     Returns:
-    - None
+    - List[str]: The path of every snapshot, in rotation order.
 
     """
+    return [
+        save_path + "_{:s}_{:03d}.png".format(rotation_axis, i)
+        for i in range(360 // rotation_step)
+    ]
 
-    # Required for correcting the geometry orientation
-    geometry.rotate_x(90, inplace=True)
 
-    jet = cm.get_cmap("jet", 64)
+def _rotation_matrix(axis: Literal["x", "y", "z"], angle: float) -> np.ndarray:
+    """
+    Returns the homogeneous matrix rotating points by an angle around an axis.
+
+    Parameters:
+    - axis (Literal["x", "y", "z"]): The rotation axis through the origin.
+    - angle (float): The rotation angle in degrees.
+
+    Returns:
+    - np.ndarray: The (4, 4) rotation matrix.
+
+    """
+    if axis not in ("x", "y", "z"):
+        raise ValueError("Rotation axis is not correct")
+
+    i, j = [k for k in range(3) if k != "xyz".index(axis)]
+    cos, sin = np.cos(np.radians(angle)), np.sin(np.radians(angle))
+
+    matrix = np.eye(4)
+    matrix[i, i], matrix[i, j] = cos, -sin
+    matrix[j, i], matrix[j, j] = sin, cos
+    if axis == "y":
+        # Keep the right-handed orientation for the (z, x) plane
+        matrix[:3, :3] = matrix[:3, :3].T
+
+    return matrix
+
+
+def get_extreme_points(points: np.ndarray) -> np.ndarray:
+    """
+    Returns the points that can bound a point cloud after any rigid transform.
+
+    The extremes of a point cloud along any direction are vertices of its convex
+    hull, so the transformed bounds of the hull vertices are those of every point.
+
+    Parameters:
+    - points (np.ndarray): The (N, 3) points.
+
+    Returns:
+    - np.ndarray: The (M, 3) convex hull vertices, or every point if the hull
+    cannot be computed, e.g. for a flat point cloud.
+
+    """
+    if ConvexHull is None or len(points) < 5:
+        return points
+
+    try:
+        return points[ConvexHull(points).vertices]
+    except Exception:  # Degenerate point clouds raise a QhullError
+        return points
+
+
+def get_snapshot_cmap() -> ListedColormap:
+    """
+    Returns the colormap of the rendered snapshots.
+
+    Returns:
+    - ListedColormap: The 64 level jet colormap.
+
+    """
+    jet = matplotlib.colormaps["jet"].resampled(64)
     cmap = jet(np.linspace(0, 1, 64))
 
     # ... Stress
@@ -43,25 +108,87 @@ def generate_rotating_snapshots(
     # ... Pressure & Curvature
     # cmap[0, 3] = 0.0
 
-    # geometry.rotate_z(130, inplace=True)
+    return ListedColormap(cmap)
 
-    for i in range(360 // rotation_step):
-        if rotation_axis == "x":
-            geometry.rotate_x(rotation_step, inplace=True)
-        elif rotation_axis == "y":
-            geometry.rotate_y(rotation_step, inplace=True)
-        elif rotation_axis == "z":
-            geometry.rotate_z(rotation_step, inplace=True)
-        else:
-            raise ValueError("Rotation axis is not correct")
 
-        pl = pv.Plotter(off_screen=True)
-        pl.enable_anti_aliasing()
-        pl.set_background("white")
+def get_cmap_fingerprint(cmap: Optional[Colormap] = None) -> str:
+    """
+    Returns a hash of the colors of a colormap, which changes with any of its colors.
+
+    Parameters:
+    - cmap (Colormap, optional): The colormap. Default is `get_snapshot_cmap()`.
+
+    Returns:
+    - str: The hexadecimal hash of the (N, 4) RGBA table of the colormap.
+
+    """
+    cmap = cmap if cmap is not None else get_snapshot_cmap()
+    table = np.ascontiguousarray(cmap(np.arange(cmap.N)), dtype=np.float64)
+    return hashlib.blake2b(table.tobytes(), digest_size=8).hexdigest()
+
+
+class SnapshotRenderer:
+    """
+    Off-screen renderer that reuses a single render window and mesh actor.
+
+    The plotter, its anti-aliasing and background are set up once per process and
+    shared by every mesh rendered in it. Views of the same mesh only orbit the
+    camera, the geometry itself is never modified.
+
+    A second plotter without anti-aliasing or lighting renders the triangle of the
+    mesh seen by every pixel, from which `get_pixel_weights` interpolates point data.
+    """
 
-        pl.add_mesh(
+    def __init__(self) -> None:
+        with profile_stage("plotter_setup"):
+            self.plotter = pv.Plotter(off_screen=True)
+            self.plotter.enable_anti_aliasing()
+            self.plotter.set_background("white")
+
+        self._initial_camera = self.plotter.camera.copy()
+        self._actor = None
+        self._points = None
+        self._extreme_points = None
+        self._shown = False
+
+        self._id_plotter = None
+        self._id_actor = None
+        self._id_shown = False
+        self._triangles = None
+        self._cells = None
+
+    def set_mesh(
+        self,
+        geometry: PolyData,
+        cmap: ListedColormap,
+        clim: List[float],
+        ambient: float,
+        scalars: Optional[str] = None,
+    ) -> None:
+        """
+        Replaces the rendered mesh.
+
+        Parameters:
+        - geometry (PolyData): The 3D geometry to be visualized.
+        - cmap (ListedColormap): The colormap used for the scalars.
+        - clim (List[float]): The color range for mapping scalar values to colors.
+        - ambient (float): The ambient lighting coefficient.
+        - scalars (str, optional): The point data array used for coloring. Default is the active scalars.
+
+        Returns:
+        - None
+
+        """
+        if self._actor is not None:
+            self.plotter.remove_actor(self._actor, render=False)
+        if self._id_actor is not None:
+            self._id_plotter.remove_actor(self._id_actor, render=False)
+            self._id_actor = None
+
+        self._actor = self.plotter.add_mesh(
             mesh=geometry,
-            cmap=ListedColormap(cmap),
+            scalars=scalars,
+            cmap=cmap,
             show_scalar_bar=False,
             clim=clim,
             ambient=ambient,
@@ -70,14 +197,725 @@ def generate_rotating_snapshots(
             opacity=1.0,
             show_edges=True,
             edge_opacity=0.1,
+            reset_camera=False,
+        )
+        self._points = np.asarray(geometry.points)
+        # Only the hull of the mesh is transformed to frame every view
+        with profile_stage("extreme_points"):
+            self._extreme_points = get_extreme_points(self._points)
+        self._geometry = geometry
+
+    def set_scalars(self, name: str, clim: List[float]) -> None:
+        """
+        Colors the mesh by another of its point data arrays.
+
+        Only the mapper's color array and range are swapped, the geometry, camera
+        and lighting stay untouched.
+
+        Parameters:
+        - name (str): The name of the point data array, which must exist when calling `set_mesh`.
+        - clim (List[float]): The color range for mapping scalar values to colors.
+
+        Returns:
+        - None
+
+        """
+        mapper = self._actor.mapper
+        mapper.SetScalarModeToUsePointFieldData()
+        mapper.SelectColorArray(name)
+        mapper.SetScalarRange(*clim)
+        mapper.GetLookupTable().SetRange(*clim)
+
+    def set_view(self, transform: np.ndarray) -> None:
+        """
+        Places the camera to view the mesh as it would look after a rigid transform.
+
+        The camera is first set up in the transformed frame, exactly as a freshly
+        created plotter would frame the transformed mesh, and then moved back into
+        the frame of the untouched mesh with the inverse transform. This orbits the
+        camera around the mesh and gives the same view as transforming the mesh.
+
+        Parameters:
+        - transform (np.ndarray): The (4, 4) rigid transform of the view.
+
+        Returns:
+        - None
+
+        """
+        rotation, translation = transform[:3, :3], transform[:3, 3]
+
+        # Frame the exact bounds the mesh would have after the transform
+        points = self._extreme_points @ rotation.T + translation
+        bounds = np.stack([points.min(axis=0), points.max(axis=0)], axis=1).ravel()
+
+        renderer = self.plotter.renderer
+        self.plotter.camera = self._initial_camera.copy()
+        renderer.ResetCamera(*bounds)
+        renderer.ResetCameraClippingRange(*bounds)
+        self.plotter.camera.zoom(2.0)
+        self.plotter.camera.focal_point = (0, 0, 20.0)
+        self.plotter.camera.elevation = -20
+
+        # Move the camera into the frame of the untransformed mesh
+        camera = self.plotter.camera
+        position = np.array(camera.GetPosition())
+        focal_point = np.array(camera.GetFocalPoint())
+        view_up = np.array(camera.GetViewUp())
+        camera.SetPosition(*((position - translation) @ rotation))
+        camera.SetFocalPoint(*((focal_point - translation) @ rotation))
+        camera.SetViewUp(*(view_up @ rotation))
+
+    def render(self) -> np.ndarray:
+        """
+        Renders the current view of the mesh.
+
+        Returns:
+        - np.ndarray: The rendered (H, W, 3) uint8 image.
+
+        """
+        if not self._shown:
+            self.plotter.show(auto_close=False)
+            self._shown = True
+        else:
+            self.plotter.render()
+
+        return self.plotter.image
+
+    def render_shading(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Renders the lighting of the current view and the coverage of the mesh.
+
+        The shading is the lit mesh in white on a black background, with halved
+        ambient and diffuse coefficients so that it never saturates. Since the colors
+        of the mesh are scaled by the lighting, a snapshot is the colors of the scalars
+        times twice the shading. The coverage is the unlit mesh in white on a black
+        background, i.e. the fraction of every pixel covered by the anti-aliased mesh.
+
+        Returns:
+        - Tuple[np.ndarray, np.ndarray]: The (H, W) uint8 shading and coverage images.
+
+        """
+        mapper, prop = self._actor.mapper, self._actor.prop
+        state = (
+            mapper.GetScalarVisibility(),
+            prop.GetColor(),
+            prop.GetAmbient(),
+            prop.GetDiffuse(),
+            prop.GetEdgeVisibility(),
+        )
+
+        try:
+            mapper.ScalarVisibilityOff()
+            prop.SetColor(1.0, 1.0, 1.0)
+            prop.SetAmbient(state[2] / 2)
+            prop.SetDiffuse(state[3] / 2)
+            self.plotter.set_background("black")
+            shading = self.render()[..., 0].copy()
+
+            prop.LightingOff()
+            prop.EdgeVisibilityOff()
+            prop.SetAmbient(1.0)
+            prop.SetDiffuse(0.0)
+            coverage = self.render()[..., 0].copy()
+        finally:
+            mapper.SetScalarVisibility(state[0])
+            prop.SetColor(*state[1])
+            prop.SetAmbient(state[2])
+            prop.SetDiffuse(state[3])
+            prop.SetEdgeVisibility(state[4])
+            prop.LightingOn()
+            self.plotter.set_background("white")
+
+        return shading, coverage
+
+    def _set_id_mesh(self) -> None:
+        # Every triangle of the surface is colored by its index + 1 over 24 bits
+        surface = self._geometry.extract_surface(pass_pointid=True, pass_cellid=True)
+        if "vtkOriginalPointIds" not in surface.point_data:
+            surface.point_data["vtkOriginalPointIds"] = np.arange(surface.n_points)
+        if "vtkOriginalCellIds" not in surface.cell_data:
+            surface.cell_data["vtkOriginalCellIds"] = np.arange(surface.n_cells)
+        surface = surface.triangulate()
+
+        triangles = np.asarray(surface.faces).reshape(-1, 4)[:, 1:]
+        if len(triangles) >= 2**24 - 1:
+            raise ValueError(f"Cannot index {len(triangles)} triangles in 24 bits")
+        ids = np.arange(1, len(triangles) + 1)
+
+        id_mesh = pv.PolyData(np.asarray(surface.points), surface.faces)
+        id_mesh.cell_data["ids"] = np.stack(
+            [ids & 255, (ids >> 8) & 255, ids >> 16], axis=1
+        ).astype(np.uint8)
+
+        if self._id_plotter is None:
+            with profile_stage("plotter_setup"):
+                self._id_plotter = pv.Plotter(
+                    off_screen=True, window_size=self.plotter.window_size
+                )
+                self._id_plotter.disable_anti_aliasing()
+                self._id_plotter.ren_win.SetMultiSamples(0)
+                self._id_plotter.set_background("black")
+
+        self._id_actor = self._id_plotter.add_mesh(
+            id_mesh,
+            scalars="ids",
+            rgb=True,
+            preference="cell",
+            lighting=False,
+            show_scalar_bar=False,
+            reset_camera=False,
+        )
+        self._triangles = np.asarray(surface.point_data["vtkOriginalPointIds"])[
+            triangles
+        ]
+        self._cells = np.asarray(surface.cell_data["vtkOriginalCellIds"])
+
+    def render_cell_ids(self) -> np.ndarray:
+        """
+        Renders the index of the surface triangle seen by every pixel of the current view.
+
+        Returns:
+        - np.ndarray: The (H, W) int64 triangle indices, -1 for the background.
+
+        """
+        if self._id_actor is None:
+            self._set_id_mesh()
+
+        # Showing the plotter resets its camera, so the view is shared afterwards
+        if not self._id_shown:
+            self._id_plotter.show(auto_close=False)
+            self._id_shown = True
+        self._id_plotter.renderer.SetActiveCamera(
+            self.plotter.renderer.GetActiveCamera()
+        )
+        self._id_plotter.render()
+
+        image = self._id_plotter.image.astype(np.int64)
+        return (image[..., 0] | (image[..., 1] << 8) | (image[..., 2] << 16)) - 1
+
+    def get_pixel_weights(
+        self, cell_ids: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Computes the points and interpolation weights of the pixels covered by the mesh.
+
+        The weights are the perspective correct barycentric coordinates of the pixel
+        centers in their triangle, the ones used to interpolate the scalars when
+        rendering the current view.
+
+        Parameters:
+        - cell_ids (np.ndarray): The (H, W) triangle indices from `render_cell_ids`.
+
+        Returns:
+        - Tuple[np.ndarray, np.ndarray, np.ndarray]: The (P,) flat indices of the covered
+          pixels, the (P, 3) indices of the points of their triangle in the geometry and
+          the (P, 3) float32 weights of these points.
+
+        """
+        height, width = cell_ids.shape
+        renderer = self.plotter.renderer
+        matrix = renderer.GetActiveCamera().GetCompositeProjectionTransformMatrix(
+            renderer.GetTiledAspectRatio(), -1, 1
+        )
+        matrix = np.array(
+            [[matrix.GetElement(i, j) for j in range(4)] for i in range(4)]
+        )
+
+        pixels = np.flatnonzero(cell_ids >= 0)
+        point_ids = self._triangles[cell_ids.ravel()[pixels]]
+
+        # Project the corners of the triangles to the screen, rows going down
+        clip = self._points[point_ids] @ matrix[:3, :3].T + matrix[:3, 3]
+        w = self._points[point_ids] @ matrix[3, :3] + matrix[3, 3]
+        x = (clip[..., 0] / w + 1) / 2 * width
+        y = (1 - clip[..., 1] / w) / 2 * height
+
+        px = pixels % width + 0.5
+        py = pixels // width + 0.5
+        dx, dy = px - x[:, 2], py - y[:, 2]
+        det = (y[:, 1] - y[:, 2]) * (x[:, 0] - x[:, 2]) + (x[:, 2] - x[:, 1]) * (
+            y[:, 0] - y[:, 2]
+        )
+        det = np.where(np.abs(det) > 1e-12, det, np.inf)
+        l0 = ((y[:, 1] - y[:, 2]) * dx + (x[:, 2] - x[:, 1]) * dy) / det
+        l1 = ((y[:, 2] - y[:, 0]) * dx + (x[:, 0] - x[:, 2]) * dy) / det
+        weights = np.stack([l0, l1, 1 - l0 - l1], axis=1)
+
+        # Pixel centers can fall slightly outside of their rasterized triangle
+        weights = np.clip(weights, 0.0, 1.0) / w
+        weights /= weights.sum(axis=1, keepdims=True)
+
+        return pixels, point_ids, weights.astype(np.float32)
+
+    def get_cells(self, cell_ids: np.ndarray) -> np.ndarray:
+        """
+        Returns the cells of the geometry of triangle indices from `render_cell_ids`.
+        """
+        return self._cells[cell_ids]
+
+
+# Renderer shared by every snapshot generated in the current (worker) process
+_SNAPSHOT_RENDERER = None
+
+
+def get_snapshot_renderer() -> SnapshotRenderer:
+    """
+    Returns the off-screen renderer of the current process, creating it on first use.
+
+    Returns:
+    - SnapshotRenderer: The renderer of the current process.
+
+    """
+    global _SNAPSHOT_RENDERER
+    if _SNAPSHOT_RENDERER is None:
+        _SNAPSHOT_RENDERER = SnapshotRenderer()
+    return _SNAPSHOT_RENDERER
+
+
+@profiled("render")
+def render_rotating_field_views(
+    geometry: PolyData,
+    fields: Dict[str, List[float]],
+    rotation_axis: Literal["x", "y", "z"] = "z",
+    rotation_step: int = 30,
+    ambient: float = 0.3,
+    out: Optional[Dict[str, np.ndarray]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Renders rotating views of a 3D geometry for several of its point data arrays.
+
+    The geometry is set up once and every view is rendered for all fields by only
+    swapping the active scalars and color range, so the camera and lighting are
+    shared between the fields.
+
+    Parameters:
+    - geometry (PolyData): The 3D geometry to be visualized. It is not modified.
+    - fields (Dict[str, List[float]]): The color range of every point data array to render, by name.
+    - rotation_axis (Literal["x", "y", "z"], optional): The axis around which the rotation will occur. Default is "z".
+    - rotation_step (int, optional): The angle (in degrees) by which the geometry will be rotated at each step. Default is 30.
+    - ambient (float, optional): The ambient lighting coefficient. Default is 0.3.
+    - out (Dict[str, np.ndarray], optional): Preallocated (views, H, W, 3) uint8 arrays to render into,
+      by field name, e.g. np.memmap or slices of a chunked array store. Default is None.
+
+    Returns:
+    - Dict[str, np.ndarray]: The (views, H, W, 3) uint8 array of rendered views of every field,
+      empty when there are no fields.
+
+    """
+    if not fields:
+        return {}
+
+    # Required for correcting the geometry orientation
+    orientation = _rotation_matrix("x", 90)
+
+    # geometry.rotate_z(130, inplace=True)
+
+    out = dict(out or {})
+    names = list(fields)
+
+    renderer = get_snapshot_renderer()
+    renderer.set_mesh(
+        geometry, get_snapshot_cmap(), fields[names[0]], ambient, names[0]
+    )
+
+    num_views = 360 // rotation_step
+    for i in range(num_views):
+        # Orbit the camera instead of rotating the geometry in place
+        transform = (
+            _rotation_matrix(rotation_axis, (i + 1) * rotation_step) @ orientation
+        )
+        renderer.set_view(transform)
+
+        for name in names:
+            if len(names) > 1:
+                renderer.set_scalars(name, fields[name])
+
+            image = renderer.render()[:, 128:-128, :]
+            if out.get(name) is None:
+                out[name] = np.empty((num_views,) + image.shape, dtype=np.uint8)
+            out[name][i] = image
+
+    return out
+
+
+def render_rotating_views(
+    geometry: PolyData,
+    clim: List[float] = [0.0, 0.4],
+    rotation_axis: Literal["x", "y", "z"] = "z",
+    rotation_step: int = 30,
+    ambient: float = 0.3,
+    out: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Renders a series of rotating views of a 3D geometry into a single array.
+
+    Parameters:
+    - geometry (PolyData): The 3D geometry to be visualized, colored by its active scalars. It is not modified.
+    - clim (List[float], optional): The color range for mapping scalar values to colors. Default is [0.0, 0.4].
+    - rotation_axis (Literal["x", "y", "z"], optional): The axis around which the rotation will occur. Default is "z".
+    - rotation_step (int, optional): The angle (in degrees) by which the geometry will be rotated at each step. Default is 30.
+    - ambient (float, optional): The ambient lighting coefficient. Default is 0.3.
+    - out (np.ndarray, optional): A preallocated (views, H, W, 3) uint8 array to render into, e.g. a
+      np.memmap or a slice of a chunked array store. Default is None, which allocates a new array.
+
+    Returns:
+    - np.ndarray: The (views, H, W, 3) uint8 array of rendered views (`out` if provided).
+
+    """
+    name = geometry.active_scalars_name
+    views = render_rotating_field_views(
+        geometry, {name: clim}, rotation_axis, rotation_step, ambient, {name: out}
+    )
+    return views[name]
+
+
+@profiled("render")
+def render_rotating_scalar_views(
+    geometry: PolyData,
+    fields: List[str],
+    rotation_axis: Literal["x", "y", "z"] = "z",
+    rotation_step: int = 30,
+    ambient: float = 0.3,
+) -> Dict[str, np.ndarray]:
+    """
+    Renders rotating views of the scalar values of a 3D geometry, before any color mapping.
+
+    Every view stores the point data interpolated at every pixel, as when rendering
+    the snapshots, together with the shading and coverage of the mesh. Snapshots for
+    any color range or colormap are then made by `colorize_views` without rendering.
+
+    Parameters:
+    - geometry (PolyData): The 3D geometry to be visualized. It is not modified.
+    - fields (List[str]): The point data arrays to render.
+    - rotation_axis (Literal["x", "y", "z"], optional): The axis around which the rotation will occur. Default is "z".
+    - rotation_step (int, optional): The angle (in degrees) by which the geometry will be rotated at each step. Default is 30.
+    - ambient (float, optional): The ambient lighting coefficient. Default is 0.3.
+
+    Returns:
+    - Dict[str, np.ndarray]: The (views, H, W) uint8 'shading' and 'coverage' from
+      `SnapshotRenderer.render_shading`, and the (views, H, W) float32 values of every
+      field as 'scalars.<field>', NaN where the mesh is not visible.
+
+    """
+    orientation = _rotation_matrix("x", 90)
+
+    renderer = get_snapshot_renderer()
+    renderer.set_mesh(geometry, get_snapshot_cmap(), [0.0, 1.0], ambient, fields[0])
+    values = {name: np.asarray(geometry.point_data[name]) for name in fields}
+
+    num_views = 360 // rotation_step
+    views = {}
+    for i in range(num_views):
+        transform = (
+            _rotation_matrix(rotation_axis, (i + 1) * rotation_step) @ orientation
+        )
+        renderer.set_view(transform)
+
+        shading, coverage = renderer.render_shading()
+        cell_ids = renderer.render_cell_ids()
+        pixels, point_ids, weights = renderer.get_pixel_weights(cell_ids)
+
+        images = {"shading": shading, "coverage": coverage}
+        for name in fields:
+            image = np.full(cell_ids.size, np.nan, dtype=np.float32)
+            image[pixels] = np.einsum("pk,pk->p", weights, values[name][point_ids])
+            images["scalars." + name] = image.reshape(cell_ids.shape)
+
+        for key, image in images.items():
+            image = image[:, 128:-128]
+            if key not in views:
+                views[key] = np.empty((num_views,) + image.shape, dtype=image.dtype)
+            views[key][i] = image
+
+    return views
+
+
+def colorize_views(
+    scalars: np.ndarray,
+    shading: np.ndarray,
+    coverage: np.ndarray,
+    clim: List[float],
+    cmap: Optional[Colormap] = None,
+    background: Tuple[int, int, int] = (255, 255, 255),
+) -> np.ndarray:
+    """
+    Colors rendered scalar views with a lookup table, as the snapshots are rendered.
+
+    The values are mapped to the colors of the colormap like VTK does, scaled by
+    the shading and blended with the background by the coverage of the mesh and
+    the alpha of the colors.
+
+    Parameters:
+    - scalars (np.ndarray): The (views, H, W) values of a field from `render_rotating_scalar_views`.
+    - shading (np.ndarray): The matching (views, H, W) uint8 shading.
+    - coverage (np.ndarray): The matching (views, H, W) uint8 coverage.
+    - clim (List[float]): The color range for mapping scalar values to colors.
+    - cmap (Colormap, optional): The colormap. Default is `get_snapshot_cmap()`.
+    - background (Tuple[int, int, int], optional): The RGB background color. Default is white.
+
+    Returns:
+    - np.ndarray: The (views, H, W, 3) uint8 snapshots, as from `render_rotating_views`.
+
+    Example:
+        views = colorize_views(scalar_views["scalars.Stress"], scalar_views["shading"],
+                               scalar_views["coverage"], [0.0, 0.5])
+
+    """
+    cmap = cmap if cmap is not None else get_snapshot_cmap()
+    table = cmap(np.arange(cmap.N)).astype(np.float32)
+    table[:, :3] *= 255
+
+    low, high = clim
+    scale = cmap.N / (high - low) if high > low else 0.0
+    background = np.asarray(background, dtype=np.float32)
+
+    colored = np.empty(scalars.shape + (3,), dtype=np.uint8)
+    for i in range(len(scalars)):
+        index = np.nan_to_num((scalars[i] - low) * scale, nan=0.0)
+        colors = table[np.clip(index, 0, cmap.N - 1).astype(np.intp)]
+
+        # The shading was rendered at half intensity, premultiplied by the coverage
+        lit = shading[i].astype(np.float32)[..., None] * (2 / 255)
+        alpha = colors[..., 3:] * (coverage[i].astype(np.float32)[..., None] / 255)
+        image = colors[..., :3] * colors[..., 3:] * lit + (1 - alpha) * background
+        colored[i] = np.clip(image + 0.5, 0, 255).astype(np.uint8)
+
+    return colored
+
+
+@profiled("pixel_maps")
+def render_rotating_pixel_maps(
+    geometry: PolyData,
+    rotation_axis: Literal["x", "y", "z"] = "z",
+    rotation_step: int = 30,
+    point_range: Optional[Tuple[int, int]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Renders the points and cells of a 3D geometry seen by every pixel of its rotating views.
+
+    Only the pixels covered by the mesh are stored, view after view. Every pixel
+    has the cell it sees and the three points of its triangle with their
+    interpolation weights, so point data is rendered by a weighted sum and
+    predicted views are projected back onto the points by `back_project_views`.
+
+    Parameters:
+    - geometry (PolyData): The 3D geometry, rendered as in `render_rotating_views`. It is not modified.
+    - rotation_axis (Literal["x", "y", "z"], optional): The axis around which the rotation will occur. Default is "z".
+    - rotation_step (int, optional): The angle (in degrees) by which the geometry will be rotated at each step. Default is 30.
+    - point_range (Tuple[int, int], optional): Only keep the pixels of the points in [start, stop), numbered
+      from start, e.g. the aorta of a combined stent and aorta. Occlusions by the other points are kept.
+      Default is all points.
+
+    Returns:
+    - Dict[str, np.ndarray]: The (H, W) 'shape' of the views, the (views + 1,) 'offsets' of the pixels of
+      every view, and for every pixel its flat index in the view ('pixels', int32), its cell ('cells', int32),
+      its points ('point_ids', (P, 3) int32) and their weights ('weights', (P, 3) float32).
+
+    Example:
+        maps = render_rotating_pixel_maps(stent + aorta, point_range=(stent.n_points, stent.n_points + aorta.n_points))
+
+    """
+    orientation = _rotation_matrix("x", 90)
+
+    renderer = get_snapshot_renderer()
+    renderer.set_mesh(geometry, get_snapshot_cmap(), [0.0, 1.0], 0.3)
+
+    maps = {"pixels": [], "cells": [], "point_ids": [], "weights": []}
+    offsets = [0]
+    for i in range(360 // rotation_step):
+        transform = (
+            _rotation_matrix(rotation_axis, (i + 1) * rotation_step) @ orientation
         )
+        renderer.set_view(transform)
 
-        pl.camera.zoom(2.0)
-        pl.camera.focal_point = (0, 0, 20.0)
-        pl.camera.elevation = -20
+        cell_ids = renderer.render_cell_ids()
+        pixels, point_ids, weights = renderer.get_pixel_weights(cell_ids)
+        cells = renderer.get_cells(cell_ids.ravel()[pixels])
 
-        pl.show(auto_close=False)
-        image = Image.fromarray(pl.image[:, 128:-128, :])
-        image.save(save_path + "_{:s}_{:03d}.png".format(rotation_axis, i))
-        pl.close()
-        pl.deep_clean()
+        # Keep the pixels of the cropped views
+        height, width = cell_ids.shape
+        rows, columns = pixels // width, pixels % width - 128
+        keep = (columns >= 0) & (columns < width - 256)
+        if point_range is not None:
+            start, stop = point_range
+            keep &= np.all((point_ids >= start) & (point_ids < stop), axis=1)
+            point_ids = point_ids - start
+
+        maps["pixels"].append((rows * (width - 256) + columns)[keep])
+        maps["cells"].append(cells[keep])
+        maps["point_ids"].append(point_ids[keep])
+        maps["weights"].append(weights[keep])
+        offsets.append(offsets[-1] + int(keep.sum()))
+
+    return {
+        "shape": np.array([height, width - 256], dtype=np.int64),
+        "offsets": np.array(offsets, dtype=np.int64),
+        "pixels": np.concatenate(maps["pixels"]).astype(np.int32),
+        "cells": np.concatenate(maps["cells"]).astype(np.int32),
+        "point_ids": np.concatenate(maps["point_ids"]).astype(np.int32),
+        "weights": np.concatenate(maps["weights"]).astype(np.float32),
+    }
+
+
+def save_pixel_maps(path: str, maps: Dict[str, np.ndarray]) -> None:
+    """
+    Saves the pixel maps from `render_rotating_pixel_maps` to a .npz file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(temp_path, **maps)
+    os.replace(temp_path, path)
+
+
+def load_pixel_maps(path: str) -> Dict[str, np.ndarray]:
+    """
+    Loads the pixel maps saved by `save_pixel_maps`.
+    """
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def back_project_views(
+    maps: Dict[str, np.ndarray],
+    views: np.ndarray,
+    num_points: int,
+    confidence: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fuses per view values, e.g. predicted stress views, into values of the points.
+
+    Every visible pixel contributes its value to the points of its triangle with
+    its interpolation weights, over all views at once. The value of a point is the
+    weighted mean of its contributions, so points seen head-on and in many views,
+    which cover more pixels, weigh more than points seen at grazing angles.
+
+    Parameters:
+    - maps (Dict[str, np.ndarray]): The pixel maps from `render_rotating_pixel_maps`.
+    - views (np.ndarray): The (views, H, W) values of the views, NaN values are ignored.
+    - num_points (int): The number of points of the mapped geometry (or point range).
+    - confidence (np.ndarray, optional): (views, H, W) weights of the pixels, e.g. a
+      model confidence. Default is None, which weighs every pixel the same.
+
+    Returns:
+    - Tuple[np.ndarray, np.ndarray]: The (num_points,) values, NaN for the points never
+      seen, and the (num_points,) total weight (visibility) of every point.
+
+    Example:
+        values, visibility = back_project_views(maps, predicted_views, aorta.n_points)
+
+    """
+    shape = tuple(maps["shape"])
+    if views.shape[1:] != shape or len(views) != len(maps["offsets"]) - 1:
+        raise ValueError(
+            f"Views of shape {views.shape} do not match "
+            f"{len(maps['offsets']) - 1} maps of shape {shape}"
+        )
+
+    # Flat index of every mapped pixel in the stack of views
+    view_index = np.repeat(np.arange(len(views)), np.diff(maps["offsets"]))
+    pixels = view_index * (shape[0] * shape[1]) + maps["pixels"]
+
+    values = views.reshape(-1)[pixels].astype(np.float64)
+    weights = maps["weights"].astype(np.float64)
+    if confidence is not None:
+        weights = weights * confidence.reshape(-1)[pixels, None]
+
+    valid = np.isfinite(values)
+    weights[~valid] = 0.0
+    values[~valid] = 0.0
+
+    point_ids = maps["point_ids"].ravel()
+    totals = np.bincount(point_ids, weights.ravel(), minlength=num_points)
+    sums = np.bincount(
+        point_ids, (weights * values[:, None]).ravel(), minlength=num_points
+    )
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        point_values = np.where(totals > 0, sums / totals, np.nan)
+
+    return point_values, totals
+
+
+def open_views_store(
+    path: str,
+    num_cases: int,
+    num_views: int = 12,
+    image_shape: Tuple[int, int] = (768, 768),
+) -> np.ndarray:
+    """
+    Opens a memory-mapped (cases, views, H, W, 3) uint8 store for rendered views.
+
+    Every case is a contiguous chunk of the store, so `render_rotating_views` can
+    render straight into it with `out=store[case_index]`. An existing store with the
+    same shape is reopened for writing instead of being truncated.
+
+    Parameters:
+    - path (str): The path of the store (.npy) file.
+    - num_cases (int): The number of cases in the store.
+    - num_views (int, optional): The number of views per case. Default is 12.
+    - image_shape (Tuple[int, int], optional): The (H, W) shape of a view. Default is (768, 768).
+
+    Returns:
+    - np.ndarray: The memory-mapped store.
+
+    """
+    shape = (num_cases, num_views) + tuple(image_shape) + (3,)
+    if os.path.exists(path):
+        store = np.lib.format.open_memmap(path, mode="r+")
+        if store.shape == shape and store.dtype == np.uint8:
+            return store
+        del store
+
+    return np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=shape)
+
+
+@profiled("png_encode")
+def save_snapshots(
+    views: np.ndarray,
+    save_path: str,
+    rotation_axis: Literal["x", "y", "z"] = "z",
+    rotation_step: int = 30,
+) -> None:
+    """
+    Saves rendered views as the PNG images written by `generate_rotating_snapshots`.
+
+    Parameters:
+    - views (np.ndarray): The (views, H, W, 3) uint8 array from `render_rotating_views`.
+    - save_path (str): The path where the snapshots will be saved.
+    - rotation_axis (Literal["x", "y", "z"], optional): The rotation axis of the views. Default is "z".
+    - rotation_step (int, optional): The rotation step of the views in degrees. Default is 30.
+
+    Returns:
+    - None
+
+    """
+    snapshot_paths = get_snapshot_paths(save_path, rotation_axis, rotation_step)
+    for view, snapshot_path in zip(views, snapshot_paths):
+        Image.fromarray(np.asarray(view)).save(snapshot_path)
+
+
+def generate_rotating_snapshots(
+    geometry: PolyData,
+    save_path: str,
+    clim: List[float] = [0.0, 0.4],
+    rotation_axis: Literal["x", "y", "z"] = "z",
+    rotation_step: int = 30,
+    ambient: float = 0.3,
+) -> None:
+    """
+    Generates a series of rotating snapshots of a 3D geometry and saves them as images.
+
+    Parameters:
+    - geometry (PolyData): The 3D geometry to be visualized. It is not modified.
+    - save_path (str): The path where the generated snapshots will be saved.
+    - clim (List[float], optional): The color range for mapping scalar values to colors. Default is [0.0, 0.4].
+    - rotation_axis (Literal["x", "y", "z"], optional): The axis around which the rotation will occur. Default is "z".
+    - rotation_step (int, optional): The angle (in degrees) by which the geometry will be rotated at each step. Default is 30.
+    - ambient (float, optional): The ambient lighting coefficient. Default is 0.3.
+
+    Returns:
+    - None
+
+    """
+    views = render_rotating_views(geometry, clim, rotation_axis, rotation_step, ambient)
+    save_snapshots(views, save_path, rotation_axis, rotation_step)
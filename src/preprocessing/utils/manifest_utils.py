@@ -0,0 +1,175 @@
+import os
+import json
+from typing import Dict, Iterable, List, Optional, Set
+
+
+def get_file_stamp(path: str) -> str:
+    """
+    Returns a cheap stamp of a file that changes whenever the file is rewritten.
+
+    Parameters:
+        path (str): The path of the file.
+
+    Returns:
+        str: The stamp made of the file size and modification time.
+    """
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def load_manifest(manifest_path: str) -> Dict:
+    """
+    Loads a manifest file, returning an empty manifest if it does not exist.
+
+    Parameters:
+        manifest_path (str): The path of the manifest (.json) file.
+
+    Returns:
+        Dict: The manifest.
+    """
+    try:
+        with open(manifest_path, "r") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest_path: str, manifest: Dict) -> None:
+    """
+    Atomically writes a manifest file.
+
+    Parameters:
+        manifest_path (str): The path of the manifest (.json) file.
+        manifest (Dict): The manifest.
+
+    Returns:
+        None
+    """
+    os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+    temp_path = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(temp_path, manifest_path)
+
+
+def make_manifest_entry(
+    input_paths: List[str], output_paths: List[str], params: Optional[Dict] = None
+) -> Dict:
+    """
+    Records the inputs, parameters and outputs of a step once it has completed.
+
+    Parameters:
+        input_paths (List[str]): The files the step was computed from.
+        output_paths (List[str]): The files written by the step.
+        params (Dict, optional): The JSON serializable parameters of the step. Default is None.
+
+    Returns:
+        Dict: The manifest entry of the step.
+
+    Example:
+        entry = make_manifest_entry([inp_file], [vtk_file])
+    """
+    return {
+        "inputs": {path: get_file_stamp(path) for path in input_paths},
+        "outputs": {path: get_file_stamp(path) for path in output_paths},
+        "params": params or {},
+    }
+
+
+def is_up_to_date(
+    entry: Optional[Dict],
+    input_paths: List[str],
+    output_paths: List[str],
+    params: Optional[Dict] = None,
+) -> bool:
+    """
+    Checks whether a step recorded in a manifest entry can be skipped.
+
+    A step is up to date when it ran with the same parameters on the same inputs
+    and all of its outputs still exist unchanged.
+
+    Parameters:
+        entry (Optional[Dict]): The manifest entry of the step, or None if it never ran.
+        input_paths (List[str]): The files the step is computed from.
+        output_paths (List[str]): The files written by the step.
+        params (Dict, optional): The JSON serializable parameters of the step. Default is None.
+
+    Returns:
+        bool: True if the outputs do not need to be recomputed.
+
+    Example:
+        if is_up_to_date(load_manifest(manifest_path), [inp_file], [vtk_file]):
+            return
+    """
+    if not entry or entry.get("params") != (params or {}):
+        return False
+
+    try:
+        inputs = {path: get_file_stamp(path) for path in input_paths}
+        outputs = {path: get_file_stamp(path) for path in output_paths}
+    except OSError:
+        # An input or output file is missing
+        return False
+
+    return entry.get("inputs") == inputs and entry.get("outputs") == outputs
+
+
+def prune_manifests(manifests_dir: str, names: Iterable[str]) -> Set[str]:
+    """
+    Deletes the manifests of a directory whose step no longer exists.
+
+    Parameters:
+        manifests_dir (str): The directory holding one manifest (.json) file per step.
+        names (Iterable[str]): The file names of the manifests to keep.
+
+    Returns:
+        Set[str]: The outputs recorded by the kept manifests.
+
+    Example:
+        outputs = prune_manifests(manifests_dir, [case + ".json" for case in cases])
+    """
+    if not os.path.isdir(manifests_dir):
+        return set()
+
+    names = set(names)
+    outputs = set()
+    for name in os.listdir(manifests_dir):
+        if not name.endswith(".json"):
+            continue
+        manifest_path = os.path.join(manifests_dir, name)
+        if name in names:
+            outputs.update(load_manifest(manifest_path).get("outputs", {}))
+        else:
+            os.remove(manifest_path)
+
+    return outputs
+
+
+def prune_outputs(output_dir: str, output_paths: Iterable[str]) -> List[str]:
+    """
+    Deletes the files of an output directory that are not current outputs.
+
+    Incremental runs never clean their output directories, so the outputs of
+    removed inputs would otherwise stay next to the current ones.
+
+    Parameters:
+        output_dir (str): The directory written by a step.
+        output_paths (Iterable[str]): The outputs recorded in the current manifest entries.
+
+    Returns:
+        List[str]: The deleted files.
+
+    Example:
+        prune_outputs(pairs_dir, [path for entry in manifest.values() for path in entry["outputs"]])
+    """
+    if not os.path.isdir(output_dir):
+        return []
+
+    keep = {os.path.normpath(path) for path in output_paths}
+    removed = []
+    for entry in os.scandir(output_dir):
+        if entry.is_file() and os.path.normpath(entry.path) not in keep:
+            os.remove(entry.path)
+            removed.append(entry.path)
+
+    return sorted(removed)
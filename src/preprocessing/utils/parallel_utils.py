@@ -0,0 +1,89 @@
+import time
+import traceback
+from tqdm import tqdm
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .profiling_utils import profile_stage
+
+
+def _run_case(
+    func: Callable, case: Tuple, stage: str = ""
+) -> Tuple[Tuple, Optional[str], Any]:
+    """
+    Runs a single work unit and captures any failure instead of raising it.
+
+    Parameters:
+        func (Callable): The function to call with the case as positional arguments.
+        case (Tuple): The work unit, e.g. (patient, size).
+        stage (str, optional): The stage name the work unit is profiled under. Default is "".
+
+    Returns:
+        Tuple[Tuple, Optional[str], Any]: The case, the formatted traceback or None on
+        success, and the return value of the function or None on failure.
+    """
+    # Cases of strings, e.g. (patient, size), are profiled under their joined name
+    case_name = "_".join(case) if all(isinstance(item, str) for item in case) else None
+    try:
+        with profile_stage(stage or getattr(func, "__name__", "case"), case_name):
+            result = func(*case)
+        return case, None, result
+    except Exception:
+        return case, traceback.format_exc(), None
+
+
+def run_cases_in_parallel(
+    func: Callable,
+    cases: List[Tuple],
+    num_workers: int = 1,
+    stage: str = "",
+    results: Optional[Dict[Tuple, Any]] = None,
+) -> List[Tuple[Tuple, str]]:
+    """
+    Fans work units out over a process pool and reports the stage throughput.
+
+    A failing work unit does not abort the run, its traceback is collected and
+    returned together with the failures of all other units.
+
+    Parameters:
+        func (Callable): A picklable (module level) function called as func(*case).
+        cases (List[Tuple]): The work units, e.g. the (patient, size) cases from `get_cases`.
+        num_workers (int, optional): The number of worker processes. Values <= 1 run in-process. Default is 1.
+        stage (str, optional): The stage name shown in the progress bar and the report. Default is "".
+        results (Dict[Tuple, Any], optional): Collects the return value of every successful
+            work unit, by work unit. Default is None.
+
+    Returns:
+        List[Tuple[Tuple, str]]: The failed cases with their tracebacks.
+
+    Example:
+        failures = run_cases_in_parallel(convert_case, get_cases(patients_path), 32, "inp_to_vtk")
+    """
+    failures = []
+    start_time = time.perf_counter()
+
+    def _collect(case, error, result):
+        if error is not None:
+            failures.append((case, error))
+            tqdm.write(f"[{stage}] {case} failed:\n{error}")
+        elif results is not None:
+            results[case] = result
+
+    if num_workers <= 1:
+        for case in tqdm(cases, desc=stage):
+            _collect(*_run_case(func, case, stage))
+    else:
+        with ProcessPoolExecutor(max_workers=num_workers) as executor:
+            futures = [executor.submit(_run_case, func, case, stage) for case in cases]
+            for future in tqdm(as_completed(futures), total=len(futures), desc=stage):
+                _collect(*future.result())
+
+    # Report the throughput of the stage
+    elapsed = time.perf_counter() - start_time
+    throughput = len(cases) / elapsed if elapsed > 0 else float("inf")
+    print(
+        f"[{stage}] {len(cases) - len(failures)}/{len(cases)} cases succeeded "
+        f"in {elapsed:.1f}s ({throughput:.2f} cases/s, {num_workers} workers)"
+    )
+
+    return failures
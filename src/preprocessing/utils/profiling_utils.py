@@ -0,0 +1,360 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from functools import wraps
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+# Only the standard library is imported at module level, so that scripts outside
+# the preprocessing tree can load this file without the utils package
+if TYPE_CHECKING:
+    import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Setting this variable to a directory enables profiling in every process started with it
+PROFILE_ENV = "TAVI_PROFILE_DIR"
+PROFILE_TRACE_FILE = "trace.json"
+PROFILE_SUMMARY_FILE = "summary.csv"
+
+# Number of buffered events after which a process appends them to its events file
+_FLUSH_EVENTS = 1024
+
+_PROFILER = None
+_DISABLED_SPAN = nullcontext()
+
+
+def _read_io_counters() -> Optional[Dict[str, int]]:
+    # Bytes read and written by the process through system calls, Linux only
+    try:
+        with open("/proc/self/io", "rb") as file:
+            counters = dict(line.split(b": ") for line in file.read().splitlines())
+        return {"read": int(counters[b"rchar"]), "written": int(counters[b"wchar"])}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _get_peak_rss() -> Optional[int]:
+    # Peak resident set size of the process in bytes
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _Profiler:
+    """
+    Records the spans of a process and appends them to its own events file.
+
+    The events of a process are buffered and written when the outermost span of its
+    main thread ends, so the worker processes of a pool do not depend on exit handlers
+    to save them. Spans of other threads are written in batches of _FLUSH_EVENTS.
+    """
+
+    def __init__(self, profile_dir: str) -> None:
+        self.profile_dir = profile_dir
+        os.makedirs(profile_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.pid = os.getpid()
+        self.events = []
+
+    def get_stack(self) -> List[Dict]:
+        # Forked processes start with an empty stack and buffer
+        if getattr(self.local, "pid", None) != os.getpid():
+            self.local.pid = os.getpid()
+            self.local.stack = []
+        return self.local.stack
+
+    def add(self, event: Dict, flush: bool) -> None:
+        with self.lock:
+            if self.pid != os.getpid():
+                self.pid = os.getpid()
+                self.events = []
+            self.events.append(event)
+            if flush or len(self.events) >= _FLUSH_EVENTS:
+                self._flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            if self.pid == os.getpid():
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self.events:
+            return
+        lines = "".join(json.dumps(event) + "\n" for event in self.events)
+        events_path = os.path.join(self.profile_dir, f"events-{self.pid}.jsonl")
+        with open(events_path, "a") as file:
+            file.write(lines)
+        self.events = []
+
+
+class _Span:
+    """
+    Times a stage and records its resource usage as a Chrome trace event.
+
+    The CPU time, bytes read/written and peak RSS are process-wide counters, so
+    they include the work of the other threads running during the span.
+    """
+
+    def __init__(self, profiler: _Profiler, name: str, case: Optional[str], args: Dict):
+        self.profiler = profiler
+        self.name = name
+        self.case = case
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        stack = self.profiler.get_stack()
+        # Nested spans belong to the case of their parent
+        if self.case is None and stack:
+            self.case = stack[-1].case
+        stack.append(self)
+
+        self.io = _read_io_counters()
+        self.timestamp = time.time_ns()
+        self.cpu = time.process_time_ns()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb) -> None:
+        wall = time.perf_counter_ns() - self.start
+        cpu = time.process_time_ns() - self.cpu
+        io = _read_io_counters()
+
+        stack = self.profiler.get_stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+
+        args = dict(self.args)
+        args.update(
+            case=self.case,
+            cpu_s=cpu / 1e9,
+            peak_rss_bytes=_get_peak_rss(),
+            read_bytes=io["read"] - self.io["read"] if io and self.io else None,
+            written_bytes=(
+                io["written"] - self.io["written"] if io and self.io else None
+            ),
+        )
+        if exc_type is not None:
+            args["error"] = exc_type.__name__
+
+        self.profiler.add(
+            {
+                "name": self.name,
+                "cat": "stage",
+                "ph": "X",
+                "ts": self.timestamp / 1e3,
+                "dur": wall / 1e3,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": args,
+            },
+            flush=not stack and threading.current_thread() is threading.main_thread(),
+        )
+
+
+def enable_profiling(profile_dir: str) -> None:
+    """
+    Enables profiling in this process and in the worker processes it starts afterwards.
+
+    Parameters:
+        profile_dir (str): The directory the events of every process are written to.
+
+    Returns:
+        None
+
+    Example:
+        enable_profiling('/tmp/profile')
+    """
+    global _PROFILER
+    os.environ[PROFILE_ENV] = profile_dir
+    if _PROFILER is not None:
+        _PROFILER.flush()
+    _PROFILER = _Profiler(profile_dir)
+
+
+def disable_profiling() -> None:
+    """
+    Writes the pending events and disables profiling.
+    """
+    global _PROFILER
+    os.environ.pop(PROFILE_ENV, None)
+    if _PROFILER is not None:
+        _PROFILER.flush()
+    _PROFILER = None
+
+
+def profiling_enabled() -> bool:
+    return _PROFILER is not None
+
+
+def profile_stage(name: str, case: Optional[str] = None, **args):
+    """
+    Returns a context manager recording a stage when profiling is enabled.
+
+    Every span records its wall time, CPU time, peak RSS and bytes read/written.
+    When profiling is disabled it returns a shared no-op context manager.
+
+    Parameters:
+        name (str): The name of the stage, e.g. 'read_mesh'.
+        case (Optional[str], optional): The case of the stage. Default is the case of the enclosing span.
+        **args: Extra values stored with the event.
+
+    Returns:
+        The context manager.
+
+    Example:
+        with profile_stage("render", case=f"{patient}_{size}"):
+            views = render_rotating_views(geometry)
+    """
+    if _PROFILER is None:
+        return _DISABLED_SPAN
+    return _Span(_PROFILER, name, case, args)
+
+
+def profiled(name: Optional[str] = None) -> Callable:
+    """
+    Decorates a function to record every call as a stage when profiling is enabled.
+
+    Parameters:
+        name (Optional[str], optional): The name of the stage. Default is the function name.
+
+    Returns:
+        Callable: The decorator.
+
+    Example:
+        @profiled("pv.read")
+        def read(path): ...
+    """
+
+    def decorator(func: Callable) -> Callable:
+        stage = name or func.__name__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if _PROFILER is None:
+                return func(*args, **kwargs)
+            with _Span(_PROFILER, stage, None, {}):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def load_profile_events(profile_dir: str) -> List[Dict]:
+    """
+    Loads the events written by every profiled process, sorted by start time.
+
+    Parameters:
+        profile_dir (str): The profiling directory.
+
+    Returns:
+        List[Dict]: The Chrome trace events.
+    """
+    events = []
+    for file_name in sorted(os.listdir(profile_dir)):
+        if file_name.startswith("events-") and file_name.endswith(".jsonl"):
+            with open(os.path.join(profile_dir, file_name), "r") as file:
+                events += [json.loads(line) for line in file if line.strip()]
+    return sorted(events, key=lambda event: event["ts"])
+
+
+def summarize_profile(events: List[Dict], by: str = "name") -> "pd.DataFrame":
+    """
+    Aggregates profiled events by stage, or by case.
+
+    Nested stages are also counted in the totals of their parents.
+
+    Parameters:
+        events (List[Dict]): The events from `load_profile_events`.
+        by (str, optional): The 'name' of the stages or their 'case'. Default is 'name'.
+
+    Returns:
+        pd.DataFrame: The calls, total and mean wall time, total CPU time, maximum
+        peak RSS and total MB read/written of every stage, slowest first.
+    """
+    import pandas as pd
+
+    columns = [
+        "calls",
+        "wall_s",
+        "mean_wall_s",
+        "cpu_s",
+        "peak_rss_mb",
+        "read_mb",
+        "written_mb",
+    ]
+    if not events:
+        return pd.DataFrame(columns=columns)
+
+    table = pd.DataFrame(
+        {
+            "name": [event["name"] for event in events],
+            "case": [event["args"].get("case") for event in events],
+            "wall_s": [event["dur"] / 1e6 for event in events],
+            "cpu_s": [event["args"].get("cpu_s") for event in events],
+            "peak_rss_mb": [event["args"].get("peak_rss_bytes") for event in events],
+            "read_mb": [event["args"].get("read_bytes") for event in events],
+            "written_mb": [event["args"].get("written_bytes") for event in events],
+        }
+    )
+    for column in ["peak_rss_mb", "read_mb", "written_mb"]:
+        table[column] = pd.to_numeric(table[column]) / 1024**2
+
+    summary = table.groupby(by).agg(
+        calls=("wall_s", "size"),
+        wall_s=("wall_s", "sum"),
+        mean_wall_s=("wall_s", "mean"),
+        cpu_s=("cpu_s", "sum"),
+        peak_rss_mb=("peak_rss_mb", "max"),
+        read_mb=("read_mb", "sum"),
+        written_mb=("written_mb", "sum"),
+    )
+    return summary[columns].sort_values("wall_s", ascending=False)
+
+
+def export_profile(profile_dir: Optional[str] = None) -> "pd.DataFrame":
+    """
+    Merges the events of every profiled process into a Chrome trace and a summary table.
+
+    The trace ('trace.json') opens in chrome://tracing or Perfetto, the summary
+    ('summary.csv') aggregates the stages and is printed.
+
+    Parameters:
+        profile_dir (Optional[str], optional): The profiling directory. Default is the
+            directory of the TAVI_PROFILE_DIR environment variable.
+
+    Returns:
+        pd.DataFrame: The summary of every stage.
+
+    Example:
+        export_profile('/tmp/profile')
+    """
+    profile_dir = profile_dir or os.environ[PROFILE_ENV]
+    if _PROFILER is not None:
+        _PROFILER.flush()
+
+    events = load_profile_events(profile_dir)
+    with open(os.path.join(profile_dir, PROFILE_TRACE_FILE), "w") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    summary = summarize_profile(events)
+    summary.to_csv(os.path.join(profile_dir, PROFILE_SUMMARY_FILE))
+    print(summary.to_string(float_format=lambda value: f"{value:.3f}"))
+
+    return summary
+
+
+# Processes started with the environment variable record their stages from the start
+if os.environ.get(PROFILE_ENV):
+    _PROFILER = _Profiler(os.environ[PROFILE_ENV])
+
+atexit.register(lambda: _PROFILER is not None and _PROFILER.flush())
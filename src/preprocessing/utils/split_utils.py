@@ -0,0 +1,132 @@
+import os
+import hashlib
+from typing import Dict, List, Literal, Optional, Tuple
+
+from .manifest_utils import load_manifest, save_manifest
+
+
+def get_patient_split(
+    patient: str, train_percentage: float
+) -> Literal["train", "test"]:
+    """
+    Assigns a patient to a split from a hash of its name.
+
+    The assignment only depends on the patient name, so it is the same on every
+    machine and does not change when other patients are added.
+
+    Parameters:
+        patient (str): The patient name, e.g. 'PATIENT-1'.
+        train_percentage (float): The expected fraction of patients in the train split.
+
+    Returns:
+        Literal["train", "test"]: The split of the patient.
+    """
+    digest = hashlib.blake2b(patient.encode(), digest_size=8).digest()
+    position = int.from_bytes(digest, "big") / 2**64
+    return "train" if position < train_percentage else "test"
+
+
+def update_split_manifest(
+    manifest_path: str,
+    patients: List[str],
+    train_percentage: float,
+    previous_splits: Optional[Dict[str, str]] = None,
+) -> Dict[str, str]:
+    """
+    Returns the split of every patient, recording new patients in the split manifest.
+
+    Patients already in the manifest keep their split, new patients are assigned
+    with `get_patient_split`, so adding patients never moves existing ones.
+
+    Parameters:
+        manifest_path (str): The path of the split manifest (.json) file.
+        patients (List[str]): The patients to assign.
+        train_percentage (float): The expected fraction of patients in the train split.
+        previous_splits (Dict[str, str], optional): The splits of the patients assigned
+            before the manifest existed, recorded when it is created. Default is None.
+
+    Returns:
+        Dict[str, str]: The split ('train' or 'test') of every patient in the manifest.
+
+    Example:
+        splits = update_split_manifest(manifest_path, os.listdir(patients_dir), 0.8)
+    """
+    manifest = load_manifest(manifest_path)
+    splits = manifest.get("patients", {})
+    if not manifest and previous_splits:
+        splits = dict(previous_splits)
+
+    new_patients = [patient for patient in patients if patient not in splits]
+    if new_patients or not manifest:
+        for patient in new_patients:
+            splits[patient] = get_patient_split(patient, train_percentage)
+        save_manifest(
+            manifest_path,
+            {
+                "train_percentage": train_percentage,
+                "patients": dict(sorted(splits.items())),
+            },
+        )
+
+    return splits
+
+
+def get_split_patients(
+    splits: Dict[str, str], patients: List[str]
+) -> Tuple[List[str], List[str]]:
+    """
+    Separates patients into their train and test splits.
+
+    Parameters:
+        splits (Dict[str, str]): The split of every patient from `update_split_manifest`.
+        patients (List[str]): The patients to separate, those missing from splits are left out.
+
+    Returns:
+        Tuple[List[str], List[str]]: The sorted train and test patients.
+    """
+    train_patients = sorted(p for p in patients if splits.get(p) == "train")
+    test_patients = sorted(p for p in patients if splits.get(p) == "test")
+    return train_patients, test_patients
+
+
+def load_split_manifest(manifest_path: str) -> Dict[str, str]:
+    """
+    Loads the split of every patient recorded in the split manifest.
+
+    Parameters:
+        manifest_path (str): The path of the split manifest (.json) file.
+
+    Returns:
+        Dict[str, str]: The split ('train' or 'test') of every patient.
+
+    Raises:
+        FileNotFoundError: If the split manifest does not exist yet.
+    """
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(
+            f"No split manifest at {manifest_path}, run geometry_to_image.py first"
+        )
+    return load_manifest(manifest_path).get("patients", {})
+
+
+def get_split_images(
+    images: List[str], splits: Dict[str, str], split: Literal["train", "test"]
+) -> List[str]:
+    """
+    Keeps the snapshots of the patients assigned to a split.
+
+    Parameters:
+        images (List[str]): The snapshot names, '<patient>_<size>_<axis>_<view>.png'.
+        splits (Dict[str, str]): The split of every patient from `load_split_manifest`.
+        split (Literal["train", "test"]): The split to keep.
+
+    Returns:
+        List[str]: The snapshots of the split, in the order of images.
+
+    Example:
+        images = get_split_images(sorted(os.listdir(input_dir)), splits, "train")
+    """
+    patients = {image.rsplit("_", 3)[0] for image in images}
+    train_patients, test_patients = get_split_patients(splits, patients)
+    kept = set(train_patients if split == "train" else test_patients)
+    return [image for image in images if image.rsplit("_", 3)[0] in kept]